@@ -1,5 +1,5 @@
+import json
 import os
-from datetime import datetime
 
 import pandas as pd
 import plotly.express as px
@@ -17,12 +17,25 @@ if 'selected_year' not in st.session_state:
     st.session_state.selected_year = None
 if 'entity_name' not in st.session_state:
     st.session_state.entity_name = ""
+if 'pdf_cache' not in st.session_state:
+    # entity -> {report id, ETag, PDF bytes}, so reruns never re-download a report
+    st.session_state.pdf_cache = {}
+
+
+@st.cache_resource
+def get_http_session():
+    # One keep-alive connection pool to the API, shared across reruns
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_entity_summary(entity: str):
     try:
-        response = requests.get(f"{API_HOST}/summarize/{entity}", timeout=60)
+        response = get_http_session().get(f"{API_HOST}/summarize/{entity}", timeout=60)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -30,11 +43,68 @@ def get_entity_summary(entity: str):
         return None
 
 
+def iter_sse(response):
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
+def stream_entity_summary(entity: str):
+    # Renders sections as the API streams them; returns the assembled payload
+    section_labels = {
+        "financial_data": "📈 Financial data",
+        "financial_analytics": "📉 Financial analytics",
+        "official_news": "📎 Official news",
+        "official_documents": "📂 Documents",
+    }
+    data = {
+        "summary": "", "official_news": [], "official_documents": [], "financial_data": {},
+        "financial_analytics": None, "errors": {}
+    }
+    progress = st.empty()
+    summary_box = st.empty()
+    loaded = []
+
+    with get_http_session().get(f"{API_HOST}/summarize/{entity}/stream", stream=True, timeout=(5, 60)) as response:
+        response.raise_for_status()
+        for event, payload in iter_sse(response):
+            if event == "summary_chunk":
+                data["summary"] += payload
+                summary_box.markdown(data["summary"], unsafe_allow_html=True)
+            elif event in section_labels:
+                data[event] = payload
+                loaded.append(section_labels[event])
+            elif event == "error":
+                data["errors"][payload["source"]] = payload["detail"]
+            elif event == "summary_sections":
+                data["summary_sections"] = payload
+            elif event == "report":
+                data["report"] = payload
+            progress.caption("Loaded: " + ", ".join(loaded) if loaded else "Summarizing...")
+
+    if not data["summary"]:
+        data["error"] = data["errors"].get("summary", "No summary returned.")
+    return data
+
+
 def display_tabs(data):
     tabs = st.tabs(["📄 Summary", "📂 Documents"])
 
     with tabs[0]:
-        st.markdown(data.get("summary", "No summary found."), unsafe_allow_html=True)
+        if data.get("summary_sections"):
+            # Structured profiles arrive with each section already rendered to HTML
+            for section in data["summary_sections"]:
+                st.subheader(section["heading"])
+                st.html(section["html"])
+        else:
+            st.markdown(data.get("summary", "No summary found."), unsafe_allow_html=True)
 
         if data.get("official_news"):
             st.subheader("📎 Official News")
@@ -64,20 +134,49 @@ def display_tabs(data):
         else:
             st.info("No documents found.")
 
-    # Download button
+    display_download(data)
+
+
+def fetch_pdf(entity_safe):
+    # Revalidates with the ETag of the last copy, so an unchanged report costs a 304 instead of the bytes
+    cached = st.session_state.pdf_cache.get(entity_safe)
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+    response = get_http_session().get(f"{API_HOST}/download/{entity_safe}", headers=headers, timeout=30)
+    response.raise_for_status()
+    if response.status_code == 304:
+        return cached
+    if response.status_code == 202:
+        return None
+    return {"etag": response.headers.get("ETag"), "content": response.content}
+
+
+def display_download(data):
     entity_safe = st.session_state.entity_name.replace(" ", "_")
-    pdf_download_url = f"{API_HOST}/download/{entity_safe}"
-    try:
-        response = requests.get(pdf_download_url)
-        response.raise_for_status()
-        st.download_button(
-            "📄 Download Summary PDF",
-            data=response.content,
-            file_name=f"{entity_safe}_summary.pdf",
-            mime="application/pdf"
-        )
-    except requests.exceptions.RequestException:
-        st.warning("PDF download failed. Try again after summarization.")
+    report_id = (data.get("report") or {}).get("id")
+    cached = st.session_state.pdf_cache.get(entity_safe)
+
+    # Only fetched on request; a new report id (fresh summary) invalidates the cached copy
+    if not cached or cached.get("report_id") != report_id:
+        if not st.button("📄 Prepare Summary PDF"):
+            return
+        try:
+            with st.spinner("Fetching PDF..."):
+                pdf = fetch_pdf(entity_safe)
+        except requests.exceptions.RequestException:
+            st.warning("PDF download failed. Try again after summarization.")
+            return
+        if pdf is None:
+            st.info("PDF is still being generated. It will be available shortly.")
+            return
+        cached = {**pdf, "report_id": report_id}
+        st.session_state.pdf_cache[entity_safe] = cached
+
+    st.download_button(
+        "📄 Download Summary PDF",
+        data=cached["content"],
+        file_name=f"{entity_safe}_summary.pdf",
+        mime="application/pdf"
+    )
 
 
 # Main form
@@ -90,166 +189,109 @@ if submit_button:
         st.warning("Please enter a valid company/entity name.")
     else:
         st.session_state.entity_name = entity.strip()
-        with st.spinner("Summarizing..."):
-            data = get_entity_summary(entity.strip())
-
-            if data and "error" not in data:
-                st.session_state.summary_data = data
-                if data.get("official_documents"):
-                    docs_by_year = {}
-                    for doc in data["official_documents"]:
-                        year = doc.get("year", "Unknown")
-                        docs_by_year.setdefault(year, []).append(doc)
-                    st.session_state.selected_year = sorted(docs_by_year.keys(), reverse=True)[0]
-                st.rerun()
-            elif data and "error" in data:
-                st.error(data["error"])
-            else:
-                st.error("Failed to summarize entity. Please try again.")
-
-
-def display_financial_dashboard(financial_data: dict):
-    if not financial_data:
+        try:
+            data = stream_entity_summary(entity.strip())
+        except requests.exceptions.RequestException:
+            # Older API without the streaming endpoint: fall back to the blocking call
+            with st.spinner("Summarizing..."):
+                data = get_entity_summary(entity.strip())
+
+        if data and "error" not in data:
+            st.session_state.summary_data = data
+            if data.get("official_documents"):
+                docs_by_year = {}
+                for doc in data["official_documents"]:
+                    year = doc.get("year", "Unknown")
+                    docs_by_year.setdefault(year, []).append(doc)
+                st.session_state.selected_year = sorted(docs_by_year.keys(), reverse=True)[0]
+            st.rerun()
+        elif data and "error" in data:
+            st.error(data["error"])
+        else:
+            st.error("Failed to summarize entity. Please try again.")
+
+
+def _billions(value):
+    return f"{value / 1e9:.2f}B" if value is not None else "n/a"
+
+
+def _percent(value):
+    return f"{value:+.2f}%" if value is not None else "n/a"
+
+
+def display_financial_dashboard(analytics: dict):
+    # Every series arrives precomputed from the API (see financial_analytics); this only selects and plots
+    if not analytics:
         st.info("No financial data available for visualization.")
         return
 
-    years = sorted(financial_data.keys(), reverse=True)
-    current_year = str(datetime.now().year)
-    current_month = datetime.now().month
-    completed_quarters = ["Q1", "Q2", "Q3", "Q4"]
-    if current_year in years:
-        if current_month <= 3:
-            completed_quarters = ["Q1"]
-        elif current_month <= 6:
-            completed_quarters = ["Q1", "Q2"]
-        elif current_month <= 9:
-            completed_quarters = ["Q1", "Q2", "Q3"]
-
-    selected_year = st.selectbox("Select Year", years, index=0)
-    available_quarters = sorted(financial_data[selected_year].keys())
-    if selected_year == current_year:
-        available_quarters = [q for q in available_quarters if q in completed_quarters]
-
-    selected_quarter = st.selectbox("Select Quarter", available_quarters, index=len(available_quarters) - 1)
-    current = financial_data[selected_year][selected_quarter]
-
-    # Previous quarter logic
-    previous = None
-    prev_quarter_text = ""
-    q_list = ["Q1", "Q2", "Q3", "Q4"]
-
-    if selected_quarter == "Q1" and str(int(selected_year) - 1) in financial_data:
-        prev_year = str(int(selected_year) - 1)
-        if "Q4" in financial_data[prev_year]:
-            previous = financial_data[prev_year]["Q4"]
-            prev_quarter_text = f"Q4 {prev_year}"
-    else:
-        curr_idx = q_list.index(selected_quarter)
-        if curr_idx > 0:
-            prev_q = q_list[curr_idx - 1]
-            if prev_q in financial_data[selected_year]:
-                previous = financial_data[selected_year][prev_q]
-                prev_quarter_text = f"{prev_q} {selected_year}"
-
-    # ✅ Current quarter bar chart
-    st.subheader(f"📊 {selected_quarter} {selected_year} Financials")
-    df = pd.DataFrame([
-        {"Metric": "Revenue", "Value": current.get("revenue", 0)},
-        {"Metric": "Profit", "Value": current.get("profit", 0)}
-    ])
-    df["Label"] = df["Value"].apply(lambda x: f"{x / 1e9:.1f}B")
-    fig = px.bar(df, x="Metric", y="Value", title="Quarterly Metrics", text="Label")
+    periods = analytics["periods"]
+    series = analytics["series"]
+    reported = [i for i, value in enumerate(series["revenue"]) if value is not None]
+    if not reported:
+        st.info("No financial data available for visualization.")
+        return
+
+    labels = [periods[i] for i in reported]
+    selected = st.selectbox("Select Quarter", labels, index=len(labels) - 1)
+    index = periods.index(selected)
+
+    st.subheader(f"📊 {selected} Financials")
+    fig = px.bar(
+        x=["Revenue", "Profit"],
+        y=[series["revenue"][index], series["profit"][index]],
+        labels={"x": "Metric", "y": "Value"},
+        title="Quarterly Metrics",
+        text=[_billions(series["revenue"][index]), _billions(series["profit"][index])]
+    )
     fig.update_yaxes(tickformat=".1s")
-    # st.markdown("**ℹ️ All figures are in billions (1G = 1 billion USD).**")
     st.plotly_chart(fig, use_container_width=True)
     st.caption("**ℹ️ All figures are in billions (1G = 1 billion USD).**")
 
-    # ✅ Comparison Table
-    if previous:
-        st.markdown(f"### 🔁 Comparison with Previous Quarter ({prev_quarter_text})")
-        comp_df = pd.DataFrame([
-            {"Metric": "Revenue", "Previous": previous.get("revenue", 0), "Current": current.get("revenue", 0)},
-            {"Metric": "Profit", "Previous": previous.get("profit", 0), "Current": current.get("profit", 0)}
-        ])
-        comp_df["Change (%)"] = comp_df.apply(
-            lambda row: ((row["Current"] - row["Previous"]) / max(row["Previous"], 0.01)) * 100
-            if row["Previous"] != 0 else 0,
-            axis=1
+    st.markdown("### 🔁 Changes and Trailing Twelve Months")
+    st.dataframe(pd.DataFrame({
+        "Metric": ["Revenue", "Profit"],
+        "Current": [_billions(series[name][index]) for name in ("revenue", "profit")],
+        "QoQ": [_percent(analytics["qoq_pct"][name][index]) for name in ("revenue", "profit")],
+        "YoY": [_percent(analytics["yoy_pct"][name][index]) for name in ("revenue", "profit")],
+        "TTM": [_billions(analytics["ttm"][name][index]) for name in ("revenue", "profit")],
+    }), hide_index=True)
+
+    margins = analytics["margins_pct"]
+    fig = px.line(
+        pd.DataFrame({"Period": periods, **{name.replace("_", " ").title(): margins[name] for name in margins}}),
+        x="Period", y=[name.replace("_", " ").title() for name in margins], title="Margins (%)", markers=True
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    forecast = analytics.get("forecast")
+    st.markdown("### 🔮 Forecast")
+    if not forecast:
+        st.warning("Not enough data for a forecast. At least three quarters of data are required.")
+        return
+    history = slice(max(len(periods) - 8, 0), None)
+    for name, title in (("revenue", "Revenue"), ("profit", "Profit")):
+        projection = forecast.get(name)
+        if not projection:
+            continue
+        fig = px.line(x=periods[history], y=series[name][history], markers=True,
+                      labels={"x": "Period", "y": title}, title=f"{title} with {projection['method']} forecast")
+        fig.add_scatter(x=forecast["periods"], y=projection["mean"], mode="lines+markers", name="Forecast")
+        fig.add_scatter(
+            x=forecast["periods"] + forecast["periods"][::-1],
+            y=projection["upper"] + projection["lower"][::-1],
+            fill="toself", mode="lines", line={"width": 0}, opacity=0.2,
+            name=f"{forecast['confidence']:.0%} band"
         )
-        formatted_df = pd.DataFrame({
-            "Metric": comp_df["Metric"],
-            "Previous": [f"{val / 1e9:.2f}B" for val in comp_df["Previous"]],
-            "Current": [f"{val / 1e9:.2f}B" for val in comp_df["Current"]],
-            "Change (%)": [f"{val:+.2f}%" for val in comp_df["Change (%)"]]
-        })
-        st.dataframe(formatted_df)
-
-    # ✅ Prediction
-    st.markdown("### 🔮 Prediction (Linear Extrapolation)")
-    q_index = {"Q1": 1, "Q2": 2, "Q3": 3, "Q4": 4}
-
-    past_data = []
-    for year in years:
-        for q in sorted(financial_data[year].keys()):
-            data = financial_data[year][q]
-            if data.get("revenue") is not None and data.get("profit") is not None:
-                quarter_num = q_index[q]
-                year_num = int(year)
-                time_key = year_num * 10 + quarter_num
-                past_data.append((time_key, quarter_num, year, q, data["revenue"], data["profit"]))
-
-    past_data.sort()
-
-    if len(past_data) >= 2:
-        time_keys = [item[0] for item in past_data]
-        revenues = [item[4] for item in past_data]
-        profits = [item[5] for item in past_data]
-        rev_trend = revenues[-1] - revenues[-2]
-        prof_trend = profits[-1] - profits[-2]
-
-        current_q_idx = q_index[selected_quarter]
-        current_year_num = int(selected_year)
-
-        next_q_idx = current_q_idx + 1
-        next_year_num = current_year_num
-        if next_q_idx > 4:
-            next_q_idx = 1
-            next_year_num += 1
-        next_q = [k for k, v in q_index.items() if v == next_q_idx][0]
-
-        predicted_revenue = revenues[-1] + rev_trend
-        predicted_profit = profits[-1] + prof_trend
-
-        st.info(f"Prediction for {next_q} {next_year_num}:\n"
-                f"- Revenue: {predicted_revenue / 1e9:.2f}B\n"
-                f"- Profit: {predicted_profit / 1e9:.2f}B")
-
-        if len(past_data) >= 3:
-            trend_df = pd.DataFrame([{
-                "Period": f"{item[3]} {item[2]}",
-                "Revenue": item[4],
-                "Profit": item[5]
-            } for item in past_data[-4:]])
-            trend_df = pd.concat([
-                trend_df,
-                pd.DataFrame([{
-                    "Period": f"{next_q} {next_year_num} (Pred)",
-                    "Revenue": predicted_revenue,
-                    "Profit": predicted_profit
-                }])
-            ])
-            fig = px.line(trend_df, x="Period", y=["Revenue", "Profit"],
-                          title="Financial Trends with Prediction",
-                          markers=True)
-            fig.update_yaxes(tickformat=".1s")
-            st.plotly_chart(fig, use_container_width=True)
-            st.caption("**ℹ️ All figures are in billions (1G = 1 billion USD).**")
-    else:
-        st.warning("Not enough data for prediction. At least two quarters of data are required.")
+        fig.update_yaxes(tickformat=".1s")
+        st.plotly_chart(fig, use_container_width=True)
+    next_quarter = {name: forecast[name]["mean"][0] if forecast.get(name) else None for name in ("revenue", "profit")}
+    st.info(f"Prediction for {forecast['periods'][0]}:\n"
+            f"- Revenue: {_billions(next_quarter['revenue'])}\n"
+            f"- Profit: {_billions(next_quarter['profit'])}")
 
 
 if st.session_state.summary_data:
     display_tabs(st.session_state.summary_data)
 
-    if "financial_data" in st.session_state.summary_data:
-        display_financial_dashboard(st.session_state.summary_data["financial_data"])
+    display_financial_dashboard(st.session_state.summary_data.get("financial_analytics"))
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from google.api_core import exceptions as google_exceptions
+
+
+class Profile:
+    # Latency (ms, uniformly jittered), error and throttle behaviour for one fake provider
+    def __init__(self, latency_ms=50.0, jitter_ms=20.0, error_rate=0.0, throttle_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+    @classmethod
+    def parse(cls, spec):
+        # "latency_ms[:jitter_ms[:error_rate[:throttle_rate]]]", e.g. "800:200:0.02:0.01"
+        parts = [float(part) for part in spec.split(":")] if spec else []
+        return cls(*parts)
+
+    async def delay(self):
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(self.latency_ms + jitter, 0.0) / 1000)
+
+    def outcome(self):
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return "throttle"
+        if roll < self.throttle_rate + self.error_rate:
+            return "error"
+        return "ok"
+
+    def __repr__(self):
+        return (f"{self.latency_ms:g}ms±{self.jitter_ms:g} "
+                f"errors={self.error_rate:g} throttles={self.throttle_rate:g}")
+
+
+def _seed(*parts):
+    return int(hashlib.sha256("|".join(parts).encode()).hexdigest()[:8], 16)
+
+
+def cse_app(profile):
+    app = FastAPI()
+
+    @app.get("/customsearch/v1")
+    async def search(q: str, num: int = 10, start: int = 1):
+        await profile.delay()
+        outcome = profile.outcome()
+        if outcome == "throttle":
+            return JSONResponse(status_code=429, content={"error": {
+                "message": "Quota exceeded", "errors": [{"reason": "rateLimitExceeded"}]
+            }})
+        if outcome == "error":
+            return JSONResponse(status_code=503, content={"error": {"message": "Backend Error"}})
+        entity = q.split(" (")[0].split(" latest")[0]
+        slug = "".join(c for c in entity.lower() if c.isalnum()) or "company"
+        rng = random.Random(_seed(q, str(start)))
+        items = []
+        for i in range(num):
+            year = rng.randint(2015, date.today().year)
+            host = rng.choice([f"www.{slug}.com", f"ir.{slug}.com", "www.sec.gov", "news.example.com"])
+            items.append({
+                "title": f"{entity} {'Annual Report' if 'filetype' in q else 'News'} {year} #{start + i}",
+                "link": f"https://{host}/{year}/doc-{start + i}.pdf",
+            })
+        return {"items": items}
+
+    return app
+
+
+def alphavantage_app(profile):
+    app = FastAPI()
+
+    @app.get("/query")
+    async def query(request: Request):
+        params = request.query_params
+        await profile.delay()
+        outcome = profile.outcome()
+        if outcome == "throttle":
+            # Alpha Vantage throttles with a 200 and a lone "Note"
+            return {"Note": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day."}
+        if outcome == "error":
+            return JSONResponse(status_code=502, content={"error": "bad gateway"})
+        if params.get("function") == "SYMBOL_SEARCH":
+            keywords = params.get("keywords", "")
+            symbol = "".join(c for c in keywords.upper() if c.isalpha())[:4] or "FAKE"
+            return {"bestMatches": [{"1. symbol": symbol, "2. name": keywords, "9. matchScore": "0.9"}]}
+        if params.get("function") == "INCOME_STATEMENT":
+            rng = random.Random(_seed(params.get("symbol", "")))
+            revenue = rng.uniform(1e9, 5e10)
+            quarter_end = date.today() - timedelta(days=60)
+            reports = []
+            for _ in range(12):
+                revenue *= rng.uniform(0.92, 1.08)
+                reports.append({
+                    "fiscalDateEnding": quarter_end.isoformat(),
+                    "reportedCurrency": "USD",
+                    "totalRevenue": str(int(revenue)),
+                    "grossProfit": str(int(revenue * 0.4)),
+                    "netIncome": str(int(revenue * rng.uniform(0.05, 0.2))),
+                })
+                quarter_end -= timedelta(days=91)
+            return {"symbol": params.get("symbol"), "quarterlyReports": reports}
+        return {}
+
+    return app
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Stream:
+    def __init__(self, chunks, profile):
+        self._chunks = chunks
+        self._profile = profile
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            # Spread the latency over the chunks like a real token stream
+            await asyncio.sleep(self._profile.latency_ms / 1000 / len(self._chunks))
+            yield _Response(chunk)
+
+
+class FakeGeminiModel:
+    # Stands in for genai.GenerativeModel; gemini_service only calls generate_content_async
+    def __init__(self, profile):
+        self.profile = profile
+        self.calls = 0
+
+    def _text(self, prompt):
+        entity = prompt.split("**")[1] if "**" in prompt else "Company"
+        sections = ["Industry Sector", "Products or Services", "Recent Activities and Developments",
+                    "Official Website", "Key Financial Information", "Leadership Team",
+                    "Major Clients and Partnerships"]
+        body = " ".join(["Lorem ipsum dolor sit amet, consectetur adipiscing elit."] * 6)
+        return "\n\n".join(f"## {section}\n\n{entity}: {body}" for section in sections)
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None, **kwargs):
+        self.calls += 1
+        outcome = self.profile.outcome()
+        if outcome == "throttle":
+            await asyncio.sleep(0.01)
+            raise google_exceptions.TooManyRequests("Resource has been exhausted (e.g. check quota).")
+        if outcome == "error":
+            await asyncio.sleep(0.01)
+            raise google_exceptions.ServiceUnavailable("The model is overloaded.")
+        text = self._text(prompt)
+        if generation_config:
+            keys = [key for key in generation_config["response_schema"]["properties"]]
+            text = json.dumps({key: f"{key} details" for key in keys})
+        if stream:
+            words = text.split(" ")
+            chunks = [" ".join(words[i:i + 20]) + " " for i in range(0, len(words), 20)]
+            return _Stream(chunks, self.profile)
+        await self.profile.delay()
+        return _Response(text)
+
+
+class ServerThread:
+    # Runs an ASGI app with uvicorn on a background thread
+    def __init__(self, app, port, log_level="warning"):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level=log_level))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.port = port
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout=15):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
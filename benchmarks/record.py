@@ -0,0 +1,41 @@
+# Turns the API's request log lines into a replayable stream for benchmarks.run --replay:
+#   python -m benchmarks.record api.log > requests.jsonl
+import json
+import re
+import sys
+from datetime import datetime
+from urllib.parse import quote
+
+# Written by the request middleware in main.py: "<asctime> - ... - [<id>] GET /summarize/acme -> 200 in 78.2ms"
+LINE_PATTERN = re.compile(
+    r"^(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) .*\] (?P<method>GET|POST) (?P<path>\S.*?) -> (?P<status>\d{3})"
+)
+REPLAYABLE = ("/summarize/", "/download/")
+
+
+def convert(lines):
+    first = None
+    for line in lines:
+        match = LINE_PATTERN.match(line)
+        if not match or match["method"] != "GET" or not match["path"].startswith(REPLAYABLE):
+            continue
+        at = datetime.strptime(match["time"], "%Y-%m-%d %H:%M:%S,%f")
+        first = first or at
+        yield {
+            "t": round((at - first).total_seconds(), 3),
+            "path": quote(match["path"]),
+            "status": int(match["status"]),
+        }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    for path in argv or ["-"]:
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        with stream:
+            for event in convert(stream):
+                print(json.dumps(event))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# Offline load benchmark: python -m benchmarks.run --concurrency 1,8,32 --requests 200
+# Runs the API in-process against local stand-ins for Gemini, Custom Search and Alpha Vantage;
+# see --help for provider latency/error/throttle profiles and --replay for recorded request streams.
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import httpx
+
+from benchmarks.fakes import FakeGeminiModel, Profile, ServerThread, alphavantage_app, cse_app
+
+DEFAULT_ENTITIES = [
+    "Apple", "Microsoft", "Tesla", "Amazon", "Netflix", "Nvidia", "Intel", "Adobe", "Oracle", "Salesforce",
+    "Walmart", "Pfizer", "Boeing", "Ford", "Coca Cola", "Pepsico", "Nike", "Disney", "Visa", "Mastercard",
+    "Infosys", "Wipro", "Reliance Industries", "Tata Motors", "Siemens", "Nestle", "Samsung", "Sony",
+    "Toyota", "Unilever",
+]
+
+STAGE_PATTERN = re.compile(
+    r'^summarizer_(stage|upstream_request)_duration_seconds_(sum|count)\{(?P<labels>[^}]*)\} (?P<value>\S+)$'
+)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the summarizer API")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="sessions per concurrency level")
+    parser.add_argument("--entities", help="comma-separated entity names (default: built-in list)")
+    parser.add_argument("--entity-pool", type=int, default=20, help="distinct entities drawn from (controls cache reuse)")
+    parser.add_argument("--download-ratio", type=float, default=0.5, help="share of sessions that also /download")
+    parser.add_argument("--stream", action="store_true", help="use /summarize/{entity}/stream instead of /summarize")
+    parser.add_argument("--gemini", default="1500:500", help="latency_ms[:jitter_ms[:error_rate[:throttle_rate]]]")
+    parser.add_argument("--cse", default="300:100")
+    parser.add_argument("--alphavantage", default="400:150")
+    parser.add_argument("--pdf-ms", type=float, default=200, help="fake PDF render time; <0 uses the real engines")
+    parser.add_argument("--replay", help="JSONL of {\"t\": seconds, \"path\": ...} (see benchmarks.record)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up; 0 sends as fast as possible")
+    parser.add_argument("--workdir", help="cache/summaries directory (default: a fresh temp dir)")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, cse_url, alphavantage_url):
+    # Must run before anything under summarizer/ is imported: config is read at import time
+    workdir = args.workdir or tempfile.mkdtemp(prefix="summarizer-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    defaults = {
+        "GEMINI_API_KEY": "bench", "GOOGLE_SEARCH_API_KEY": "bench", "GOOGLE_CSE_ID": "bench",
+        "ALPHAVANTAGE_API_KEY": "bench",
+        "GOOGLE_SEARCH_URL": f"{cse_url}/customsearch/v1",
+        "ALPHAVANTAGE_URL": f"{alphavantage_url}/query",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        # The stand-ins throttle per their profile; don't let local quotas mask that
+        "ALPHAVANTAGE_REQUESTS_PER_MINUTE": "100000", "ALPHAVANTAGE_REQUESTS_PER_DAY": "10000000",
+        "GOOGLE_CSE_REQUESTS_PER_MINUTE": "100000", "GOOGLE_CSE_REQUESTS_PER_DAY": "10000000",
+    }
+    if args.pdf_ms >= 0:
+        defaults["PDF_RENDERER_POOL_SIZE"] = "0"
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    return workdir
+
+
+def install_fakes(args):
+    from summarizer.services import gemini_service, pdf_renderer
+
+    gemini_service.client.model = FakeGeminiModel(Profile.parse(args.gemini))
+    if args.pdf_ms >= 0:
+        def render(html, title=None):
+            time.sleep(args.pdf_ms / 1000)
+            return b"%PDF-1.4\n% benchmark stand-in\n" + html.encode("utf-8")[:2048], {
+                "engine": "fake", "render_ms": args.pdf_ms, "pool_wait_ms": 0.0
+            }
+        pdf_renderer.render = render
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def parse_stage_totals(text):
+    totals = {}
+    for line in text.splitlines():
+        match = STAGE_PATTERN.match(line)
+        if not match:
+            continue
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', match["labels"]))
+        kind = "stage" if match[1] == "stage" else "upstream"
+        name = labels.get("stage") or labels.get("provider")
+        key = (kind, name, labels.get("outcome", ""))
+        totals.setdefault(key, [0.0, 0])
+        totals[key][0 if match[2] == "sum" else 1] += float(match["value"])
+    return totals
+
+
+def stage_breakdown(before, after):
+    rows = []
+    for key, (total, count) in sorted(after.items()):
+        prev_total, prev_count = before.get(key, (0.0, 0))
+        if count - prev_count <= 0:
+            continue
+        kind, name, outcome = key
+        rows.append({
+            "kind": kind, "name": name, "outcome": outcome, "count": int(count - prev_count),
+            "mean_ms": round((total - prev_total) / (count - prev_count) * 1000, 1),
+        })
+    return rows
+
+
+def build_sessions(args, rng):
+    entities = [e.strip() for e in args.entities.split(",")] if args.entities else DEFAULT_ENTITIES
+    pool = entities[:max(args.entity_pool, 1)]
+    summarize = "/summarize/{}/stream" if args.stream else "/summarize/{}"
+    sessions = []
+    for _ in range(args.requests):
+        entity = quote(rng.choice(pool))
+        session = [summarize.format(entity)]
+        if rng.random() < args.download_ratio:
+            session.append(f"/download/{entity}")
+        sessions.append(session)
+    return sessions
+
+
+def load_replay(path):
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda event: event.get("t", 0))
+    return events
+
+
+def _endpoint(path):
+    if path.startswith("/summarize/"):
+        return "/summarize/stream" if path.endswith("/stream") else "/summarize"
+    return "/" + path.strip("/").split("/")[0]
+
+
+async def _send(client, path, results):
+    started = time.perf_counter()
+    try:
+        response = await client.get(path)
+        if path.endswith("/stream"):
+            await response.aread()
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = f"error:{e.__class__.__name__}"
+    results.append({"endpoint": _endpoint(path), "status": status, "ms": (time.perf_counter() - started) * 1000})
+
+
+async def run_sessions(client, sessions, concurrency):
+    results = []
+    queue = asyncio.Queue()
+    for session in sessions:
+        queue.put_nowait(session)
+
+    async def worker():
+        while not queue.empty():
+            for path in queue.get_nowait():
+                await _send(client, path, results)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+async def run_replay(client, events, speed, concurrency):
+    # Open loop: requests go out on the recorded schedule whether or not earlier ones finished
+    results = []
+    slots = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def fire(event):
+        if speed > 0:
+            await asyncio.sleep(max(event.get("t", 0) / speed - (time.perf_counter() - started), 0))
+        async with slots:
+            await _send(client, event["path"], results)
+
+    await asyncio.gather(*(fire(event) for event in events))
+    return results, time.perf_counter() - started
+
+
+def summarize_results(label, concurrency, results, elapsed, stages):
+    endpoints = {}
+    for result in results:
+        endpoints.setdefault(result["endpoint"], []).append(result)
+    report = {"label": label, "concurrency": concurrency, "requests": len(results),
+              "elapsed_s": round(elapsed, 2),
+              "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+              "endpoints": {}, "stages": stages}
+    for endpoint, rows in sorted(endpoints.items()):
+        latencies = [row["ms"] for row in rows]
+        statuses = {}
+        for row in rows:
+            statuses[str(row["status"])] = statuses.get(str(row["status"]), 0) + 1
+        report["endpoints"][endpoint] = {
+            "count": len(rows), "statuses": statuses,
+            **{f"p{p}_ms": round(percentile(latencies, p), 1) for p in (50, 95, 99)},
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n== {report['label']}: concurrency {report['concurrency']}, {report['requests']} requests "
+          f"in {report['elapsed_s']}s ({report['throughput_rps']} req/s)")
+    for endpoint, row in report["endpoints"].items():
+        print(f"  {endpoint:<20} n={row['count']:<5} p50={row['p50_ms']:>9}ms p95={row['p95_ms']:>9}ms "
+              f"p99={row['p99_ms']:>9}ms  {row['statuses']}")
+    if report["stages"]:
+        print("  stage breakdown (mean per call):")
+        for stage in report["stages"]:
+            print(f"    {stage['kind']:<9} {stage['name']:<20} {stage['outcome']:<10} "
+                  f"n={stage['count']:<6} {stage['mean_ms']:>9}ms")
+
+
+async def benchmark(args, base_url):
+    rng = random.Random(args.seed)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    reports = []
+    limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        if args.replay:
+            runs = [("replay", max(levels), lambda: run_replay(client, load_replay(args.replay), args.speed, max(levels)))]
+        else:
+            runs = [
+                ("synthetic", level, lambda level=level: run_sessions(client, build_sessions(args, rng), level))
+                for level in levels
+            ]
+        for label, concurrency, run in runs:
+            before = parse_stage_totals((await client.get("/metrics")).text)
+            results, elapsed = await run()
+            after = parse_stage_totals((await client.get("/metrics")).text)
+            report = summarize_results(label, concurrency, results, elapsed, stage_breakdown(before, after))
+            print_report(report)
+            reports.append(report)
+        reports.append({"cache_stats": (await client.get("/cache/stats")).json()})
+    return reports
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+    cse = ServerThread(cse_app(Profile.parse(args.cse)), _free_port()).start()
+    alphavantage = ServerThread(alphavantage_app(Profile.parse(args.alphavantage)), _free_port()).start()
+    workdir = configure_environment(args, cse.url, alphavantage.url)
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    install_fakes(args)
+    import main as api
+
+    server = ServerThread(api.app, _free_port()).start()
+    print(f"API on {server.url}, working directory {workdir}")
+    print(f"profiles: gemini {Profile.parse(args.gemini)}, cse {Profile.parse(args.cse)}, "
+          f"alphavantage {Profile.parse(args.alphavantage)}, pdf "
+          f"{'real engines' if args.pdf_ms < 0 else f'{args.pdf_ms:g}ms fake'}")
+    try:
+        reports = asyncio.run(benchmark(args, server.url))
+    finally:
+        server.stop()
+        cse.stop()
+        alphavantage.stop()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
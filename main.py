@@ -1,6 +1,90 @@
-from fastapi import FastAPI
+import time
 
+# Everything below, up to the app being built, counts as import time in the startup report
+_import_started = time.perf_counter()
+
+import asyncio
+import importlib
+import uuid
+from functools import partial
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+
+from summarizer.config import DISABLED_PROVIDERS, SERVICE_WARM_UP
 from summarizer.routes import router
+from summarizer.services import batch_jobs, gemini_service, http_client, pdf_generator, pdf_renderer, render_queue
+from summarizer.utils import metrics, startup
+from summarizer.utils.logger import correlation_id, logger
+
+# Deferred initialization run by warm-up; anything not warmed initializes on first use instead
+WARM_UPS = {
+    "http_client": http_client.warm_up,
+    "gemini": gemini_service.client.warm_up,
+    "pdf_template": pdf_generator.warm_up,
+    "pdf_renderer": pdf_renderer.startup,
+    "financial_analytics": partial(importlib.import_module, "summarizer.services.financial_analytics"),
+}
+
+
+async def _warm_up_one(name, warm_up):
+    with startup.phase(f"warm_up_{name}"):
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            logger.warning("Warm-up of %s failed, it will initialize on first use: %s", name, e)
+
 
-app = FastAPI()
+async def warm_up():
+    await asyncio.gather(*(_warm_up_one(name, fn) for name, fn in WARM_UPS.items()))
+    startup.log("Warm-up finished")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    for provider, missing in DISABLED_PROVIDERS.items():
+        logger.warning("%s is disabled: missing %s", provider, ", ".join(missing))
+    with startup.phase("render_queue"):
+        await render_queue.startup()
+    warming = None
+    if SERVICE_WARM_UP == "blocking":
+        await warm_up()
+    elif SERVICE_WARM_UP == "background":
+        warming = asyncio.create_task(warm_up())
+    startup.record("lifespan", time.perf_counter() - started)
+    startup.log("Ready to serve")
+    yield
+    if warming is not None:
+        warming.cancel()
+        await asyncio.gather(warming, return_exceptions=True)
+    await batch_jobs.shutdown()
+    await render_queue.shutdown()
+    await http_client.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
+startup.record("imports", time.perf_counter() - _import_started)
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Reuse the caller's ID when a proxy or client sends one, so logs line up across services
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    token = correlation_id.set(request_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        # Label by route template, not raw path, so entity names don't explode the series count
+        path = route.path if route is not None else "unmatched"
+        metrics.REQUEST_LATENCY.observe(elapsed, method=request.method, route=path, status=status)
+        logger.info("%s %s -> %s in %.1fms", request.method, request.url.path, status, elapsed * 1000)
+        correlation_id.reset(token)
@@ -3,12 +3,108 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-REQUIRED_ENV_VARS = ["GEMINI_API_KEY", "GOOGLE_SEARCH_API_KEY", "GOOGLE_CSE_ID", "ALPHAVANTAGE_API_KEY"]
-missing = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
-if missing:
-    raise EnvironmentError(f"Missing environment variables: {', '.join(missing)}")
+# A provider whose credentials are missing is disabled on its own; the rest of the API keeps working
+PROVIDER_CREDENTIALS = {
+    "gemini": ["GEMINI_API_KEY"],
+    "google_cse": ["GOOGLE_SEARCH_API_KEY", "GOOGLE_CSE_ID"],
+    "alphavantage": ["ALPHAVANTAGE_API_KEY"],
+}
+DISABLED_PROVIDERS = {
+    provider: missing
+    for provider, names in PROVIDER_CREDENTIALS.items()
+    if (missing := [name for name in names if not os.getenv(name)])
+}
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GOOGLE_SEARCH_API_KEY = os.getenv("GOOGLE_SEARCH_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
-ALPHAVANTAGE_API_KEY=os.getenv("ALPHAVANTAGE_API_KEY")
\ No newline at end of file
+ALPHAVANTAGE_API_KEY=os.getenv("ALPHAVANTAGE_API_KEY")
+
+# Startup warm-up of the Gemini SDK and PDF renderer pool: "background" (serve while warming),
+# "blocking" (finish before accepting requests) or "off" (initialize on first use)
+SERVICE_WARM_UP = os.getenv("SERVICE_WARM_UP", "background").lower()
+
+# Upstream endpoints; overridden to point at local stand-ins (see benchmarks/)
+GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1")
+ALPHAVANTAGE_URL = os.getenv("ALPHAVANTAGE_URL", "https://www.alphavantage.co/query")
+
+# Per-source timeouts (seconds) for the /summarize fan-out
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "45"))
+NEWS_TIMEOUT = float(os.getenv("NEWS_TIMEOUT", "15"))
+DOCUMENTS_TIMEOUT = float(os.getenv("DOCUMENTS_TIMEOUT", "15"))
+FINANCIALS_TIMEOUT = float(os.getenv("FINANCIALS_TIMEOUT", "25"))
+
+# Server-side response cache for /summarize sources
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+# Shared tier behind each in-process LRU: "sqlite" (WAL files shared by the workers on one host),
+# "redis" (any Redis-protocol server, shared across hosts; needs the redis package) or "memory" (per process)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Redis is called synchronously from the event loop: bound each call, and after a failure skip Redis entirely
+# for CACHE_REDIS_RETRY_AFTER seconds so an unreachable server costs one timeout rather than one per lookup
+CACHE_REDIS_TIMEOUT = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.25"))
+CACHE_REDIS_RETRY_AFTER = float(os.getenv("CACHE_REDIS_RETRY_AFTER", "30"))
+# SQLite cache calls run on the event loop: wait at most this long (seconds) for another worker's write lock,
+# then treat the read as a miss or skip the write
+CACHE_SQLITE_BUSY_TIMEOUT = float(os.getenv("CACHE_SQLITE_BUSY_TIMEOUT", "0.05"))
+# Encoded values at least this large are zlib-compressed before they reach the shared tier
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+SUMMARY_CACHE_MEMORY_ENTRIES = int(os.getenv("SUMMARY_CACHE_MEMORY_ENTRIES", "2048"))
+SUMMARY_CACHE_DISK_ENTRIES = int(os.getenv("SUMMARY_CACHE_DISK_ENTRIES", "50000"))
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", str(7 * 24 * 3600)))
+# Gemini profiles past PROFILE_CACHE_TTL are still served for this long while a refresh runs in the background
+PROFILE_CACHE_STALE_TTL = int(os.getenv("PROFILE_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "20000"))
+NEWS_CACHE_TTL = int(os.getenv("NEWS_CACHE_TTL", str(30 * 60)))
+DOCUMENTS_CACHE_TTL = int(os.getenv("DOCUMENTS_CACHE_TTL", str(24 * 3600)))
+FINANCIALS_CACHE_TTL = int(os.getenv("FINANCIALS_CACHE_TTL", str(24 * 3600)))
+
+# Background PDF rendering
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_QUEUE_SIZE = int(os.getenv("PDF_RENDER_QUEUE_SIZE", "100"))
+DOWNLOAD_WAIT_TIMEOUT = float(os.getenv("DOWNLOAD_WAIT_TIMEOUT", "10"))
+
+# Global upstream concurrency caps and batch jobs
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GOOGLE_CSE_MAX_CONCURRENCY = int(os.getenv("GOOGLE_CSE_MAX_CONCURRENCY", "8"))
+ALPHAVANTAGE_MAX_CONCURRENCY = int(os.getenv("ALPHAVANTAGE_MAX_CONCURRENCY", "2"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_ENTITIES = int(os.getenv("BATCH_MAX_ENTITIES", "1000"))
+
+# Gemini client: retries on 429/503 and a circuit breaker that fails fast while upstream is degraded
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+# Ask Gemini for the seven profile sections as schema-checked JSON instead of one markdown blob
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "false").lower() in ("1", "true", "yes")
+
+# Alpha Vantage quota (free tier defaults)
+ALPHAVANTAGE_REQUESTS_PER_MINUTE = int(os.getenv("ALPHAVANTAGE_REQUESTS_PER_MINUTE", "5"))
+ALPHAVANTAGE_REQUESTS_PER_DAY = int(os.getenv("ALPHAVANTAGE_REQUESTS_PER_DAY", "25"))
+SYMBOL_CACHE_TTL = int(os.getenv("SYMBOL_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Google Custom Search quota (free tier: 100 queries/day) and how long past-TTL results may still be served
+GOOGLE_CSE_REQUESTS_PER_MINUTE = int(os.getenv("GOOGLE_CSE_REQUESTS_PER_MINUTE", "100"))
+GOOGLE_CSE_REQUESTS_PER_DAY = int(os.getenv("GOOGLE_CSE_REQUESTS_PER_DAY", "100"))
+SEARCH_CACHE_STALE_TTL = int(os.getenv("SEARCH_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "20000"))
+
+# Document discovery: result pages fetched concurrently, all within one deadline
+DOCUMENT_SEARCH_PAGES = int(os.getenv("DOCUMENT_SEARCH_PAGES", "3"))
+DOCUMENT_SEARCH_DEADLINE = float(os.getenv("DOCUMENT_SEARCH_DEADLINE", "10"))
+DOCUMENTS_PER_YEAR = int(os.getenv("DOCUMENTS_PER_YEAR", "3"))
+DOCUMENTS_MAX_RESULTS = int(os.getenv("DOCUMENTS_MAX_RESULTS", "12"))
+
+# Local quarterly statement store
+FINANCIAL_STORE_PATH = os.getenv("FINANCIAL_STORE_PATH", os.path.join(CACHE_DIR, "financials.sqlite3"))
+
+# PDF renderer pool: "auto" tries WeasyPrint first, then wkhtmltopdf
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto")
+WKHTMLTOPDF_PATH = os.getenv("WKHTMLTOPDF_PATH")
+PDF_RENDERER_POOL_SIZE = int(os.getenv("PDF_RENDERER_POOL_SIZE", "2"))
+
+# Content-addressed PDF cache: identical report inputs share one file
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join("summaries", "reports"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(1024 ** 3)))
+PDF_CACHE_MAX_AGE = int(os.getenv("PDF_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+REPORT_INDEX_PATH = os.getenv("REPORT_INDEX_PATH", os.path.join(CACHE_DIR, "report_index.sqlite3"))
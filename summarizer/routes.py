@@ -1,63 +1,179 @@
+import json
 import os
-import re
+from email.utils import formatdate
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
-from summarizer.services import alpha_financials, gemini_service, google_search, pdf_generator
+from summarizer.config import BATCH_MAX_ENTITIES, DISABLED_PROVIDERS, DOWNLOAD_WAIT_TIMEOUT, PROVIDER_CREDENTIALS
+from summarizer.services import (
+    alpha_financials, batch_jobs, gemini_service, google_search, pdf_generator, render_queue, summary_pipeline
+)
+from summarizer.utils import metrics, startup
+from summarizer.utils.entity import sanitize_entity
 
 router = APIRouter()
 
 
-@router.get("/summarize/{entity}")
-async def summarize_entity(entity: str):
+class BatchRequest(BaseModel):
+    entities: list[str]
+
+
+def _validate_entity(entity):
     if not entity.strip() or len(entity.strip()) < 2:
         raise HTTPException(status_code=400, detail="Entity name too short")
 
-    sanitized = re.sub(r'[^\w\s-]', '', entity).strip()
+    sanitized = sanitize_entity(entity)
     if not sanitized:
         raise HTTPException(status_code=400, detail="Invalid entity name")
+    return sanitized
+
+
+@router.get("/summarize/{entity}")
+async def summarize_entity(entity: str):
+    sanitized = _validate_entity(entity)
+    try:
+        return await summary_pipeline.summarize(sanitized)
+    except summary_pipeline.SummaryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.get("/summarize/{entity}/stream")
+async def summarize_entity_stream(entity: str):
+    sanitized = _validate_entity(entity)
+    return StreamingResponse(
+        summary_pipeline.summary_events(sanitized),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/batch", status_code=202)
+async def create_batch(request: BatchRequest):
+    if not request.entities:
+        raise HTTPException(status_code=400, detail="No entities given")
+    if len(request.entities) > BATCH_MAX_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ENTITIES} entities per batch")
+    try:
+        return batch_jobs.create_job(request.entities)
+    except batch_jobs.BatchCapacityError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@router.get("/batch/{job_id}")
+async def batch_status(job_id: str):
+    job = batch_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.get("/batch/{job_id}/results")
+async def batch_results(job_id: str, offset: int = 0, format: str = "json"):
+    if batch_jobs.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if format == "ndjson":
+        # Streams every result as it completes and closes once the job is done
+        lines = (json.dumps(result) + "\n" async for result in batch_jobs.iter_results(job_id, offset))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    return batch_jobs.get_results(job_id, offset)
+
+
+@router.get("/reports/{report_id}")
+async def report_status(report_id: str):
+    report = render_queue.get_report(report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
 
-    summary = gemini_service.get_company_profile(sanitized)
-    if "Error" in summary or "No data" in summary:
-        raise HTTPException(status_code=500, detail=summary)
 
-    news = google_search.fetch_news(sanitized)
-    docs = google_search.fetch_documents(sanitized)
-    symbol = alpha_financials.search_symbol(sanitized)
-    financial_data = alpha_financials.get_quarterly_financials(symbol) if symbol else {}
-    # Extract latest quarter metrics (optional, for PDF)
-    latest_year = max(financial_data.keys()) if financial_data else None
-    latest_q = max(financial_data[latest_year].keys()) if latest_year else None
-    metrics = financial_data[latest_year][latest_q] if latest_q else {}
+@router.get("/download/{entity}")
+async def download_pdf(entity: str, if_none_match: str | None = Header(None)):
+    sanitized = sanitize_entity(entity).replace(" ", "_")
+
+    # A render queued by any worker answers 202 until it lands, rather than serving the previous PDF
+    report = await render_queue.wait_for_entity(sanitized.replace("_", " "), DOWNLOAD_WAIT_TIMEOUT)
+    if report and report["status"] in (render_queue.PENDING, render_queue.RENDERING):
+        return JSONResponse(
+            status_code=202,
+            content={"id": report["id"], "status": report["status"]},
+            headers={"Retry-After": "2"}
+        )
+
+    entry = render_queue.report_index.get(sanitized.replace("_", " "))
+    if not entry:
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": formatdate(entry["mtime"], usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if if_none_match and entry["etag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    if not os.path.exists(entry["path"]):
+        # Evicted by the PDF cache GC since it was indexed
+        render_queue.report_index.discard(sanitized.replace("_", " "))
+        raise HTTPException(status_code=404, detail="PDF not found")
 
-    pdf = pdf_generator.generate_pdf(sanitized, summary, news, metrics)
+    # FileResponse answers Range requests with 206 partial content
+    return FileResponse(
+        entry["path"], media_type="application/pdf", filename=f"{sanitized}_summary.pdf", headers=headers
+    )
 
-    if not pdf:
-        raise HTTPException(status_code=500, detail="Failed to generate PDF")
 
+@router.get("/cache/stats")
+async def cache_stats():
     return {
-        "summary": summary,
-        "pdf": pdf,
-        "official_news": news,
-        "official_documents": docs,
-        "financial_data": financial_data
+        **summary_pipeline.summary_cache.snapshot(),
+        "inflight": len(summary_pipeline.summarize_flight),
+        **summary_pipeline.summarize_flight.stats,
+        "profile_cache": gemini_service.profile_cache.snapshot(),
+        "gemini": gemini_service.client.snapshot(),
+        "render_queue_depth": render_queue.queue_depth(),
+        "pdf_cache": pdf_generator.report_cache.snapshot(),
+        "indexed_reports": len(render_queue.report_index),
+        "google_cse": google_search.snapshot(),
+        "alphavantage_quota": alpha_financials.quota.snapshot(),
+        "disabled_providers": DISABLED_PROVIDERS,
+        "startup_ms": startup.report()
     }
 
 
-@router.get("/download/{entity}")
-async def download_pdf(entity: str):
-    sanitized = re.sub(r'[^\w\s-]', '', entity).strip().replace(" ", "_")
-    folder = "summaries"
-    matching_files = [
-        f for f in os.listdir(folder)
-        if f.startswith(f"{sanitized}_summary_") and f.endswith(".pdf")
+def _service_gauges():
+    quotas = {"alphavantage": alpha_financials.quota, "google_cse": google_search.quota}
+    gemini = gemini_service.client.snapshot()
+    return [
+        ("summarizer_cache_hit_ratio", "Hit ratio per cache since start", [
+            ({"cache": "summary"}, summary_pipeline.summary_cache.hit_ratio()),
+            ({"cache": "profile"}, gemini_service.profile_cache.hit_ratio()),
+            ({"cache": "search"}, google_search.search_cache.hit_ratio()),
+            ({"cache": "financials"}, alpha_financials.statement_cache.hit_ratio()),
+            ({"cache": "pdf"}, pdf_generator.report_cache.snapshot()["hit_ratio"]),
+        ]),
+        ("summarizer_render_queue_depth", "Reports waiting for a render worker", [({}, render_queue.queue_depth())]),
+        ("summarizer_summarize_inflight", "Distinct entities being summarized", [
+            ({}, len(summary_pipeline.summarize_flight))
+        ]),
+        ("summarizer_gemini_waiting", "Gemini calls queued for a concurrency slot", [({}, gemini["waiting"])]),
+        ("summarizer_gemini_inflight", "Gemini calls in flight", [({}, gemini["inflight"])]),
+        ("summarizer_circuit_open", "1 while a provider's circuit breaker is not closed", [
+            ({"provider": "gemini"}, int(gemini["breaker"]["state"] != "closed"))
+        ]),
+        ("summarizer_quota_remaining_today", "Upstream requests left in today's quota", [
+            ({"provider": name}, quota.remaining_today()) for name, quota in quotas.items()
+        ]),
+        ("summarizer_provider_enabled", "0 when a provider is disabled for missing credentials", [
+            ({"provider": name}, int(name not in DISABLED_PROVIDERS)) for name in PROVIDER_CREDENTIALS
+        ]),
+        ("summarizer_startup_phase_seconds", "Time spent in each import, startup and warm-up phase", [
+            ({"phase": name}, seconds) for name, seconds in startup.phases.items()
+        ]),
     ]
 
-    if not matching_files:
-        raise HTTPException(status_code=404, detail="PDF not found")
-
-    latest_pdf = max(matching_files)
-    full_path = os.path.join(folder, latest_pdf)
 
-    return FileResponse(full_path, media_type="application/pdf", filename=f"{sanitized}_summary.pdf")
+@router.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(_service_gauges()), media_type="text/plain; version=0.0.4")
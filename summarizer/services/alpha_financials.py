@@ -1,473 +1,180 @@
-import requests
-
-from summarizer.config import ALPHAVANTAGE_API_KEY
+import asyncio
+import os
+
+import httpx
+
+from summarizer.config import (
+    ALPHAVANTAGE_API_KEY, ALPHAVANTAGE_MAX_CONCURRENCY, ALPHAVANTAGE_REQUESTS_PER_DAY,
+    ALPHAVANTAGE_REQUESTS_PER_MINUTE, ALPHAVANTAGE_URL, CACHE_DIR, DISABLED_PROVIDERS, FINANCIAL_STORE_PATH
+)
+from summarizer.services import http_client
+from summarizer.services.financial_store import FinancialStore
+from summarizer.services.rate_limiter import QuotaExhausted, QuotaScheduler
+from summarizer.services.symbol_index import KNOWN_SYMBOLS, SymbolIndex, normalize_name
+from summarizer.utils import metrics
+from summarizer.utils.cache import MISSING, build_cache, build_counter
+from summarizer.utils.logger import logger
+from summarizer.utils.singleflight import SingleFlight
 
 API_KEY = ALPHAVANTAGE_API_KEY
-BASE_URL = "https://www.alphavantage.co/query"
-
-
-def search_symbol(company_name: str) -> str:
-    known = {
-        # Technology
-        "apple": "AAPL",
-        "microsoft": "MSFT",
-        "amazon": "AMZN",
-        "meta": "META",
-        "facebook": "META",
-        "alphabet": "GOOGL",
-        "google": "GOOGL",
-        "tesla": "TSLA",
-        "netflix": "NFLX",
-        "nvidia": "NVDA",
-        "ibm": "IBM",
-        "oracle": "ORCL",
-        "intel": "INTC",
-        "cisco": "CSCO",
-        "adobe": "ADBE",
-        "salesforce": "CRM",
-        "amd": "AMD",
-        "qualcomm": "QCOM",
-        "paypal": "PYPL",
-        "twitter": "X",
-        "x": "X",
-        "snap": "SNAP",
-        "snapchat": "SNAP",
-        # E-commerce & Internet
-        "alibaba": "BABA",
-        "baidu": "BIDU",
-        "tencent": "TCEHY",
-        "jd.com": "JD",
-        "jd": "JD",
-        "pinduoduo": "PDD",
-        "pdd": "PDD",
-        "meituan": "MPNGF",
-        "mercadolibre": "MELI",
-        "coupang": "CPNG",
-        "rakuten": "RKUNY",
-        "sea limited": "SE",
-        "shopee": "SE",
-        "grab": "GRAB",
-        "gojek": "PRIVATE",
-        "tokopedia": "PRIVATE",
-        "flipkart": "WMT",  # Owned by Walmart
-        "ozon": "OZON",
-        "vk": "VKCO",
-        "mail.ru": "VKCO",
-        "naver": "035420.KS",
-        "kakao": "035720.KS",
-        "line": "LN",
-        "weibo": "WB",
-        "bytedance": "PRIVATE",
-        "tiktok": "PRIVATE",
-        "lazada": "BABA",  # Owned by Alibaba
-
-        # Software & SaaS
-        "sap": "SAP",
-        "atlassian": "TEAM",
-        "synopsys": "SNPS",
-        "cadence": "CDNS",
-        "ansys": "ANSS",
-        "autodesk": "ADSK",
-        "dassault systemes": "DASTY",
-        "siemens plm": "SIEGY",
-        "ptc": "PTC",
-        "bentley systems": "BSY",
-        "hubspot": "HUBS",
-        "zendesk": "PRIVATE",  # Taken private
-        "freshworks": "FRSH",
-        "zoho": "PRIVATE",
-        "slack": "CRM",  # Acquired by Salesforce
-        "tableau": "CRM",  # Acquired by Salesforce
-        "mulesoft": "CRM",  # Acquired by Salesforce
-        "zuora": "ZUO",
-        "coupa": "PRIVATE",  # Taken private
-        "qualtrics": "XM",
-        "smartsheet": "SMAR",
-        "asana": "ASAN",
-        "monday.com": "MNDY",
-        "monday": "MNDY",
-        "notion": "PRIVATE",
-        "zoom": "ZM",
-        "uber": "UBER",
-        "lyft": "LYFT",
-        "airbnb": "ABNB",
-        "roblox": "RBLX",
-        "spotify": "SPOT",
-        "palantir": "PLTR",
-        "dell": "DELL",
-        "hp": "HPQ",
-        "hewlett packard": "HPQ",
-        "broadcom": "AVGO",
-        "texas instruments": "TXN",
-        "ti": "TXN",
-        "micron": "MU",
-        "micron technology": "MU",
-        "intuit": "INTU",
-        "autodesk": "ADSK",
-        "electronic arts": "EA",
-        "ea": "EA",
-        "activision blizzard": "ATVI",
-        "unity": "U",
-        "unity software": "U",
-        "twilio": "TWLO",
-        "shopify": "SHOP",
-        "square": "SQ",
-        "block": "SQ",
-        "vmware": "VMW",
-        "servicenow": "NOW",
-        "workday": "WDAY",
-        "splunk": "SPLK",
-        "snowflake": "SNOW",
-        "datadog": "DDOG",
-        "crowdstrike": "CRWD",
-        "zscaler": "ZS",
-        "okta": "OKTA",
-        "palo alto networks": "PANW",
-        "fortinet": "FTNT",
-        "docusign": "DOCU",
-        "mongodb": "MDB",
-        "cloudflare": "NET",
-        "akamai": "AKAM",
-        "dropbox": "DBX",
-        "box": "BOX",
-        "juniper networks": "JNPR",
-        "juniper": "JNPR",
-        "ericsson": "ERIC",
-        "nokia": "NOK",
-        "netapp": "NTAP",
-        "western digital": "WDC",
-        "seagate": "STX",
-        "logitech": "LOGI",
-        "lenovo": "LNVGY",
-        "asus": "ASUUY",
-        "asustek": "ASUUY",
-
-        # IT Services & Consulting
-        "wipro": "WIT",
-        "infosys": "INFY",
-        "tata consultancy services": "TCS.NS",
-        "tcs": "TCS.NS",
-        "cognizant": "CTSH",
-        "accenture": "ACN",
-        "capgemini": "CAPMF",
-        "hcl technologies": "HCLTECH.NS",
-        "hcl": "HCLTECH.NS",
-        "tech mahindra": "TECHM.NS",
-        "ibm global services": "IBM",
-        "mindtree": "MINDTREE.NS",
-        "deloitte": "PRIVATE",
-        "pwc": "PRIVATE",
-        "ey": "PRIVATE",
-        "kpmg": "PRIVATE",
-        "cgi": "GIB",
-        "epam systems": "EPAM",
-        "epam": "EPAM",
-        "dxc technology": "DXC",
-        "dxc": "DXC",
-        "genpact": "G",
-        "luxoft": "LXFT",
-        "atos": "AEXAY",
-        "ntt data": "NTDTY",
-        "fujitsu": "FJTSY",
-        "cdw": "CDW",
-
-        # Semiconductor & Electronics
-        "taiwan semiconductor": "TSM",
-        "tsmc": "TSM",
-        "asml": "ASML",
-        "applied materials": "AMAT",
-        "lam research": "LRCX",
-        "kla": "KLAC",
-        "tokyo electron": "TOELY",
-        "arm holdings": "ARM",
-        "arm": "ARM",
-        "samsung electronics": "SSNLF",
-        "samsung": "SSNLF",
-        "lg electronics": "LGEIY",
-        "lg": "LGEIY",
-        "sony": "SONY",
-        "panasonic": "PCRFY",
-        "hitachi": "HTHIY",
-        "toshiba": "TOSYY",
-        "nxp semiconductors": "NXPI",
-        "nxp": "NXPI",
-        "stmicroelectronics": "STM",
-        "renesas": "RNECY",
-        "infineon": "IFNNY",
-        "analog devices": "ADI",
-        "marvell": "MRVL",
-        "mediatek": "2454.TW",
-        "xilinx": "AMD",  # Acquired by AMD
-        "altera": "INTC",  # Acquired by Intel
+BASE_URL = ALPHAVANTAGE_URL
 
-        # Retail & Consumer
-        "walmart": "WMT",
-        "target": "TGT",
-        "costco": "COST",
-        "home depot": "HD",
-        "lowe's": "LOW",
-        "lowes": "LOW",
-        "mcdonald's": "MCD",
-        "mcdonalds": "MCD",
-        "starbucks": "SBUX",
-        "coca cola": "KO",
-        "coca-cola": "KO",
-        "coke": "KO",
-        "pepsi": "PEP",
-        "pepsico": "PEP",
-        "nike": "NKE",
-        "adidas": "ADDYY",
-        "lululemon": "LULU",
-        "chipotle": "CMG",
-        "domino's": "DPZ",
-        "dominos": "DPZ",
-        "yum brands": "YUM",
-        "kfc": "YUM",
-        "taco bell": "YUM",
-        "pizza hut": "YUM",
-        "etsy": "ETSY",
-        "ebay": "EBAY",
-        "wayfair": "W",
-        "dollar general": "DG",
-        "dollar tree": "DLTR",
-        "best buy": "BBY",
-        "tj maxx": "TJX",
-        "tjx": "TJX",
+# Alpha Vantage's daily quota resets at midnight UTC
+quota = QuotaScheduler(
+    ALPHAVANTAGE_REQUESTS_PER_MINUTE, ALPHAVANTAGE_REQUESTS_PER_DAY, reset_timezone="UTC",
+    counter=build_counter("alphavantage"), max_concurrency=ALPHAVANTAGE_MAX_CONCURRENCY
+)
 
-        # Finance
-        "jpmorgan": "JPM",
-        "jp morgan": "JPM",
-        "bank of america": "BAC",
-        "bofa": "BAC",
-        "wells fargo": "WFC",
-        "citigroup": "C",
-        "citi": "C",
-        "goldman sachs": "GS",
-        "morgan stanley": "MS",
-        "american express": "AXP",
-        "amex": "AXP",
-        "visa": "V",
-        "mastercard": "MA",
-        "blackrock": "BLK",
-        "charles schwab": "SCHW",
-        "schwab": "SCHW",
-        "fidelity": "FNF",
-        "berkshire hathaway": "BRK.A",
-        "berkshire": "BRK.A",
+# Local statement history; also what we serve when the quota is exhausted
+financial_store = FinancialStore(FINANCIAL_STORE_PATH)
+# Raw INCOME_STATEMENT responses shared through CACHE_BACKEND, so a symbol is fetched once across workers and hosts
+statement_cache = build_cache("financials_cache", 256, 5000)
+# Short, so a copy fetched by another worker never holds back a newly filed quarter for long
+STATEMENT_SHARE_TTL = 3600
 
-        # Healthcare & Pharma
-        "johnson & johnson": "JNJ",
-        "johnson and johnson": "JNJ",
-        "pfizer": "PFE",
-        "merck": "MRK",
-        "novartis": "NVS",
-        "abbvie": "ABBV",
-        "eli lilly": "LLY",
-        "lilly": "LLY",
-        "unitedhealth": "UNH",
-        "united health": "UNH",
-        "cvs": "CVS",
-        "walgreens": "WBA",
-        "moderna": "MRNA",
-        "gilead": "GILD",
-        "regeneron": "REGN",
-        "amgen": "AMGN",
-        "thermo fisher": "TMO",
-        "abbott": "ABT",
-        "abbott laboratories": "ABT",
-        "medtronic": "MDT",
+# Built once; SYMBOL_SEARCH results are learned back into it and persisted
+symbol_index = SymbolIndex(KNOWN_SYMBOLS, learned_path=os.path.join(CACHE_DIR, "learned_symbols.json"))
+MIN_SYMBOL_CONFIDENCE = 0.7
+# SYMBOL_SEARCH results below this matchScore are used for the request but not remembered as exact names
+MIN_LEARNED_MATCH_SCORE = 0.8
+_symbol_flight = SingleFlight()
+_refresh_flight = SingleFlight()
 
-        # Telecom & Media
-        "at&t": "T",
-        "att": "T",
-        "verizon": "VZ",
-        "t-mobile": "TMUS",
-        "tmobile": "TMUS",
-        "comcast": "CMCSA",
-        "charter": "CHTR",
-        "disney": "DIS",
-        "walt disney": "DIS",
-        "warner bros discovery": "WBD",
-        "warner": "WBD",
-        "paramount": "PARA",
-        "fox": "FOX",
-        "netflix": "NFLX",
 
-        # Automotive
-        "ford": "F",
-        "general motors": "GM",
-        "gm": "GM",
-        "toyota": "TM",
-        "honda": "HMC",
-        "bmw": "BMWYY",
-        "mercedes": "MBGAF",
-        "mercedes-benz": "MBGAF",
-        "daimler": "MBGAF",
-        "volkswagen": "VWAGY",
-        "vw": "VWAGY",
-        "ferrari": "RACE",
-        "lucid": "LCID",
-        "lucid motors": "LCID",
-        "rivian": "RIVN",
-        # Indian Companies
-        "reliance industries": "RELIANCE.NS",
-        "reliance": "RELIANCE.NS",
-        "tata motors": "TATAMOTORS.NS",
-        "tata steel": "TATASTEEL.NS",
-        "hdfc bank": "HDB",
-        "hdfc": "HDB",
-        "icici bank": "IBN",
-        "icici": "IBN",
-        "state bank of india": "SBIN.NS",
-        "sbi": "SBIN.NS",
-        "axis bank": "AXISBANK.NS",
-        "bajaj finance": "BAJFINANCE.NS",
-        "bajaj": "BAJFINANCE.NS",
-        "mahindra & mahindra": "M&M.NS",
-        "mahindra": "M&M.NS",
-        "larsen & toubro": "LT.NS",
-        "l&t": "LT.NS",
-        "bharti airtel": "BHARTIARTL.NS",
-        "airtel": "BHARTIARTL.NS",
-        "adani enterprises": "ADANIENT.NS",
-        "adani": "ADANIENT.NS",
-        "sun pharma": "SUNPHARMA.NS",
-        "itc limited": "ITC.NS",
-        "itc": "ITC.NS",
-        "hindustan unilever": "HINDUNILVR.NS",
-        "hul": "HINDUNILVR.NS",
+class AlphaVantageUnavailable(Exception):
+    pass
 
-        # Chinese Companies
-        "china mobile": "CHL",
-        "china telecom": "CHA",
-        "china unicom": "CHU",
-        "petrochina": "PTR",
-        "sinopec": "SNP",
-        "china construction bank": "CICHY",
-        "industrial and commercial bank of china": "IDCBY",
-        "icbc": "IDCBY",
-        "bank of china": "BACHY",
-        "agricultural bank of china": "ACGBY",
-        "ping an insurance": "PNGAY",
-        "ping an": "PNGAY",
-        "china life insurance": "LFC",
-        "huawei": "PRIVATE",
-        "xiaomi": "XIACF",
-        "oppo": "PRIVATE",
-        "vivo": "PRIVATE",
-        "byd": "BYDDY",
-        "nio": "NIO",
-        "li auto": "LI",
-        "xpeng": "XPEV",
-        "nikola": "NKLA",
 
-        # Energy
-        "exxon": "XOM",
-        "exxonmobil": "XOM",
-        "chevron": "CVX",
-        "shell": "SHEL",
-        "bp": "BP",
-        "conocophillips": "COP",
-        "occidental": "OXY",
-        "oxy": "OXY",
-        "halliburton": "HAL",
-        "schlumberger": "SLB",
-        "nextera energy": "NEE",
-        "duke energy": "DUK",
-        "southern company": "SO",
+class AlphaVantageThrottled(AlphaVantageUnavailable):
+    pass
 
-        # Industrial
-        "boeing": "BA",
-        "lockheed martin": "LMT",
-        "lockheed": "LMT",
-        "raytheon": "RTX",
-        "rtx": "RTX",
-        "general electric": "GE",
-        "ge": "GE",
-        "3m": "MMM",
-        "caterpillar": "CAT",
-        "honeywell": "HON",
-        "ups": "UPS",
-        "fedex": "FDX",
-        "deere": "DE",
-        "john deere": "DE",
-        "northrop grumman": "NOC",
-        "northrop": "NOC",
-        "siemens": "SIEGY",
-
-        # Travel & Hospitality
-        "marriott": "MAR",
-        "hilton": "HLT",
-        "delta": "DAL",
-        "delta air lines": "DAL",
-        "united airlines": "UAL",
-        "american airlines": "AAL",
-        "southwest": "LUV",
-        "southwest airlines": "LUV",
-        "booking": "BKNG",
-        "booking holdings": "BKNG",
-        "expedia": "EXPE",
-        "carnival": "CCL",
-        "royal caribbean": "RCL"
-    }
-
-    key = company_name.lower().strip()
-    if key in known:
-        return known[key]
 
+async def _query(params):
+    # Callers fall back to the local symbol index and statement store, as when throttled
+    if "alphavantage" in DISABLED_PROVIDERS:
+        missing = ", ".join(DISABLED_PROVIDERS["alphavantage"])
+        raise AlphaVantageUnavailable(f"Alpha Vantage is disabled: missing {missing}")
+    try:
+        await quota.acquire()
+    except QuotaExhausted as e:
+        metrics.UPSTREAM_THROTTLES.inc(provider="alphavantage", source="local_quota")
+        raise AlphaVantageThrottled(f"Alpha Vantage quota exhausted: {e}")
+
+    # No transport-level retries: each one would spend a request of the daily quota without taking a token
+    async with quota.in_flight():
+        response = await http_client.get(BASE_URL, params=params, retries=0)
+    response.raise_for_status()
+    data = response.json()
+    # Over-quota responses come back as 200 with only a "Note"/"Information" message
+    message = data.get("Note") or data.get("Information")
+    if message and len(data) == 1:
+        quota.record_throttle()
+        metrics.UPSTREAM_THROTTLES.inc(provider="alphavantage", source="upstream")
+        raise AlphaVantageThrottled(f"Alpha Vantage throttled the request: {message}")
+    return data
+
+
+async def resolve_symbol(company_name: str) -> dict:
+    match = symbol_index.lookup(company_name)
+    if match and match["confidence"] >= MIN_SYMBOL_CONFIDENCE:
+        return match
+
+    # Weak or no local match: ask Alpha Vantage, sharing the lookup between concurrent callers.
+    # A weak local match is never served on its own, even when the remote lookup fails
+    return await _symbol_flight.do(normalize_name(company_name), lambda: _search_remote(company_name))
+
+
+async def _search_remote(company_name):
     try:
         params = {
             "function": "SYMBOL_SEARCH",
             "keywords": company_name,
             "apikey": API_KEY
         }
-        response = requests.get(BASE_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = await _query(params)
 
         if "bestMatches" in data and len(data["bestMatches"]) > 0:
             # Return best match's symbol
             best_match = data["bestMatches"][0]
-            return best_match.get("1. symbol")
+            symbol = best_match.get("1. symbol")
+            if symbol:
+                try:
+                    confidence = float(best_match.get("9. matchScore") or 0.0)
+                except ValueError:
+                    confidence = 0.0
+                if confidence >= MIN_LEARNED_MATCH_SCORE:
+                    symbol_index.learn(company_name, symbol)
+                if best_match.get("2. name"):
+                    symbol_index.learn(best_match["2. name"], symbol)
+                return {
+                    "symbol": symbol,
+                    "name": best_match.get("2. name", company_name),
+                    "confidence": confidence,
+                    "method": "remote",
+                    "private": False,
+                }
         else:
-            print(f"No symbol found for company name: {company_name}")
-    except (requests.RequestException, ValueError) as e:
-        print(f"Error fetching symbol for {company_name}: {e}")
+            logger.info("No symbol found for company name: %s", company_name)
+    except (httpx.HTTPError, ValueError) as e:
+        # Reported under errors["symbol"] rather than looking like "no listed company"
+        raise AlphaVantageUnavailable(f"Alpha Vantage symbol search failed: {e}") from e
 
     return None
 
 
-def get_quarterly_financials(symbol: str) -> dict:
-    params = {
-        "function": "INCOME_STATEMENT",
-        "symbol": symbol,
-        "apikey": API_KEY
-    }
+def _to_quarterly(reports):
+    result = {}
+    for report in reports:
+        year, month = map(int, report["fiscal_date_ending"].split("-")[:2])
+        quarter = f"Q{(month - 1) // 3 + 1}"
+        # A figure Alpha Vantage reported as "None" stays None: a zero would read as real revenue or profit
+        result.setdefault(str(year), {})[quarter] = {
+            "revenue": report.get("totalRevenue"),
+            "profit": report.get("netIncome")
+        }
+    return result
 
-    try:
-        response = requests.get(BASE_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
 
-        result = {}
-        for report in data.get("quarterlyReports", []):
-            date = report["fiscalDateEnding"]
-            year, month = map(int, date.split("-")[:2])
-            quarter = f"Q{(month - 1) // 3 + 1}"
+def get_statements(symbol: str) -> list:
+    # Every stored INCOME_STATEMENT field per quarter, oldest first
+    return financial_store.get_reports(symbol)
 
-            try:
-                revenue = float(report.get("totalRevenue", 0) or 0)
-                profit = float(report.get("netIncome", 0) or 0)
-            except (ValueError, TypeError):
-                continue
 
-            result.setdefault(str(year), {})[quarter] = {
-                "revenue": revenue,
-                "profit": profit
-            }
+async def refresh_statements(symbol: str) -> list:
+    # Only hit the network when a new quarter is plausibly out; otherwise this is a local read.
+    # Store calls run in a thread: another worker's write can hold the SQLite lock for a while
+    if not await asyncio.to_thread(financial_store.refresh_due, symbol):
+        return await asyncio.to_thread(financial_store.get_reports, symbol)
+    return await _refresh_flight.do(symbol, lambda: _fetch_statements(symbol))
 
-        return result
 
-    except (requests.RequestException, ValueError) as e:
-        print(f"Error fetching quarterly financials for {symbol}: {e}")
-        return {}
+async def _fetch_statements(symbol):
+    shared = statement_cache.get(f"statements:{symbol}")
+    if shared is not MISSING:
+        await asyncio.to_thread(financial_store.upsert_reports, symbol, shared)
+        return await asyncio.to_thread(financial_store.get_reports, symbol)
+    params = {
+        "function": "INCOME_STATEMENT",
+        "symbol": symbol,
+        "apikey": API_KEY
+    }
+    try:
+        data = await _query(params)
+        reports = data.get("quarterlyReports", [])
+        await asyncio.to_thread(financial_store.upsert_reports, symbol, reports)
+        if reports:
+            statement_cache.set(f"statements:{symbol}", reports, STATEMENT_SHARE_TTL)
+    except (AlphaVantageUnavailable, httpx.HTTPError, ValueError) as e:
+        # Stored quarters stand in for a failed refresh; without any, the failure reaches errors["financial_data"]
+        stored = await asyncio.to_thread(financial_store.get_reports, symbol)
+        if not stored:
+            if isinstance(e, AlphaVantageUnavailable):
+                raise
+            raise AlphaVantageUnavailable(f"Alpha Vantage request failed: {e}") from e
+        logger.warning("%s - serving stored financials for %s", e, symbol)
+        return stored
+    return await asyncio.to_thread(financial_store.get_reports, symbol)
+
+
+async def get_quarterly_financials(symbol: str) -> dict:
+    return _to_quarterly(await refresh_statements(symbol))
@@ -0,0 +1,163 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+
+from summarizer.config import BATCH_MAX_CONCURRENCY
+from summarizer.services import rate_limiter, summary_pipeline
+from summarizer.utils.entity import normalize_entity, sanitize_entity
+from summarizer.utils.logger import logger
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+MAX_TRACKED_JOBS = 100
+
+_jobs = OrderedDict()
+_conditions = {}
+_tasks = {}
+# One pool of slots across all jobs so concurrent batches can't multiply upstream load
+_slots = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+
+class BatchCapacityError(Exception):
+    pass
+
+
+def _item_view(item):
+    return {k: v for k, v in item.items() if k not in ("result", "sanitized")}
+
+
+def _job_view(job):
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "total": len(job["items"]),
+        "completed": sum(1 for item in job["items"].values() if item["status"] == DONE),
+        "failed": sum(1 for item in job["items"].values() if item["status"] == FAILED),
+        "items": [_item_view(item) for item in job["items"].values()],
+    }
+
+
+def _evict_finished():
+    # Oldest finished jobs make room; a running job is never dropped out from under its client
+    for job_id in [job_id for job_id, job in _jobs.items() if job["status"] == DONE]:
+        if len(_jobs) < MAX_TRACKED_JOBS:
+            break
+        del _jobs[job_id]
+        _conditions.pop(job_id, None)
+        _tasks.pop(job_id, None)
+
+
+def create_job(entities):
+    _evict_finished()
+    if len(_jobs) >= MAX_TRACKED_JOBS:
+        raise BatchCapacityError(f"{MAX_TRACKED_JOBS} batch jobs are still running; retry once one finishes")
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "created_at": time.time(),
+        "finished_at": None,
+        "items": OrderedDict(),
+        "results": [],
+    }
+    for entity in entities:
+        sanitized = sanitize_entity(entity)
+        key = normalize_entity(sanitized) or entity
+        if key in job["items"]:
+            job["items"][key]["aliases"].append(entity)
+            continue
+        item = {"entity": entity, "key": key, "sanitized": sanitized, "aliases": [], "status": QUEUED, "error": None}
+        if len(sanitized) < 2:
+            item.update(status=FAILED, error="Invalid entity name")
+            job["results"].append({**_item_view(item), "result": None})
+        job["items"][key] = item
+
+    _jobs[job["id"]] = job
+    _conditions[job["id"]] = asyncio.Condition()
+    _tasks[job["id"]] = asyncio.create_task(_run_job(job))
+    return _job_view(job)
+
+
+def get_job(job_id):
+    job = _jobs.get(job_id)
+    return _job_view(job) if job else None
+
+
+def get_results(job_id, offset=0):
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    results = job["results"][offset:]
+    return {
+        "id": job_id,
+        "status": job["status"],
+        "offset": offset,
+        "next_offset": offset + len(results),
+        "results": results,
+    }
+
+
+async def iter_results(job_id, offset=0):
+    job = _jobs.get(job_id)
+    condition = _conditions.get(job_id)
+    if job is None or condition is None:
+        return
+    while True:
+        while offset < len(job["results"]):
+            yield job["results"][offset]
+            offset += 1
+        if job["status"] == DONE:
+            return
+        async with condition:
+            await condition.wait_for(lambda: offset < len(job["results"]) or job["status"] == DONE)
+
+
+async def _notify(job):
+    condition = _conditions.get(job["id"])
+    if condition is not None:
+        async with condition:
+            condition.notify_all()
+
+
+async def _run_item(job, item):
+    # Each item runs in its own task, so this only deprioritizes batch work in quota queues
+    rate_limiter.request_priority.set(rate_limiter.BATCH)
+    async with _slots:
+        item["status"] = RUNNING
+        try:
+            # No PDFs for batch items: they would fill the render queue interactive requests depend on.
+            # GET /summarize/{entity} renders one later, mostly from cache
+            item["result"] = await summary_pipeline.summarize(item["sanitized"], render=False)
+            item["status"] = DONE
+        except summary_pipeline.SummaryError as e:
+            item.update(status=FAILED, error=e.detail)
+        except Exception as e:
+            logger.exception("Batch %s failed for %s", job["id"], item["entity"])
+            item.update(status=FAILED, error=str(e) or e.__class__.__name__)
+    job["results"].append({**_item_view(item), "result": item.get("result")})
+    await _notify(job)
+
+
+async def _run_job(job):
+    job["status"] = RUNNING
+    try:
+        await asyncio.gather(*(
+            _run_item(job, item) for item in job["items"].values() if item["status"] == QUEUED
+        ))
+    finally:
+        job["status"] = DONE
+        job["finished_at"] = time.time()
+        await _notify(job)
+
+
+async def shutdown():
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _tasks.clear()
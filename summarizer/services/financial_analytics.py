@@ -0,0 +1,161 @@
+import numpy as np
+
+from summarizer.config import FINANCIALS_CACHE_TTL
+from summarizer.utils.cache import MISSING, build_cache
+
+# Bump whenever the computed series or the forecast change so cached analytics are not reused
+ANALYTICS_VERSION = 1
+
+FORECAST_QUARTERS = 4
+# Trend fits use at most this much history; older quarters say little about the next year
+FORECAST_WINDOW = 20
+# Seasonal terms need a couple of full years beside the trend, or they just fit noise
+SEASONAL_MIN_QUARTERS = 8
+FORECAST_CONFIDENCE = 0.8
+# Two-sided 80% Student t quantiles by residual degrees of freedom; large samples approach 1.2816
+_T_DOF = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20, 30, 60, 1000])
+_T_80 = np.array([3.078, 1.886, 1.638, 1.533, 1.476, 1.440, 1.415, 1.397, 1.383, 1.372, 1.356, 1.341, 1.325,
+                  1.310, 1.296, 1.282])
+
+# Output series -> INCOME_STATEMENT field
+FIELDS = {
+    "revenue": "totalRevenue",
+    "profit": "netIncome",
+    "gross_profit": "grossProfit",
+    "operating_income": "operatingIncome",
+}
+MARGINS = {"gross_margin": "gross_profit", "operating_margin": "operating_income", "net_margin": "profit"}
+FORECAST_SERIES = ("revenue", "profit")
+
+# Keyed by symbol and statement version, so a new quarter in the store is a new key rather than a stale hit
+analytics_cache = build_cache("analytics_cache", 256, 5000)
+
+
+def _quarter_ordinals(reports):
+    dates = [report["fiscal_date_ending"] for report in reports]
+    years = np.array([int(d[:4]) for d in dates])
+    months = np.array([int(d[5:7]) for d in dates])
+    return years * 4 + (months - 1) // 3
+
+
+def _pct_change(values, lag):
+    change = np.full(values.shape, np.nan)
+    previous = values[:-lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change[lag:] = np.where(previous != 0, (values[lag:] - previous) / np.abs(previous) * 100, np.nan)
+    return change
+
+
+def _trailing_sum(values, window=4):
+    # Only where all `window` quarters are present; a gap would understate the total
+    total = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        filled = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+        present = np.concatenate(([0], np.cumsum(~np.isnan(values))))
+        sums = filled[window:] - filled[:-window]
+        complete = (present[window:] - present[:-window]) == window
+        total[window - 1:] = np.where(complete, sums, np.nan)
+    return total
+
+
+def _design(ordinals, seasonal):
+    columns = [np.ones(len(ordinals)), ordinals.astype(float)]
+    if seasonal:
+        quarters = ordinals % 4
+        columns.extend((quarters == q).astype(float) for q in (1, 2, 3))
+    return np.column_stack(columns)
+
+
+def _forecast(ordinals, values, horizon):
+    # Least squares trend (plus quarter-of-year dummies once there is enough history) with a prediction interval
+    known = ~np.isnan(values)
+    x, y = ordinals[known][-FORECAST_WINDOW:], values[known][-FORECAST_WINDOW:]
+    if len(y) < 3:
+        return None
+    seasonal = len(y) >= SEASONAL_MIN_QUARTERS
+    origin = x[-1]
+    design = _design(x - origin, seasonal)
+    coef, _, rank, _ = np.linalg.lstsq(design, y, rcond=None)
+    dof = len(y) - rank
+    residuals = y - design @ coef
+    sigma = np.sqrt(residuals @ residuals / dof) if dof > 0 else 0.0
+
+    future = np.arange(1, horizon + 1) + origin
+    future_design = _design(future - origin, seasonal)
+    mean = future_design @ coef
+    # Spread grows with distance from the fitted data: sigma * sqrt(1 + x0 (X'X)^-1 x0')
+    leverage = np.einsum("ij,jk,ik->i", future_design, np.linalg.pinv(design.T @ design), future_design)
+    t = np.interp(max(dof, 1), _T_DOF, _T_80)
+    spread = t * sigma * np.sqrt(1 + leverage)
+    return {
+        "mean": _round(mean),
+        "lower": _round(mean - spread),
+        "upper": _round(mean + spread),
+        "method": "linear+seasonal" if seasonal else "linear",
+        "fitted_quarters": int(len(y)),
+    }
+
+
+def _round(values, digits=2):
+    # Compact, JSON-safe arrays: NaN becomes null
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def _label(ordinal):
+    return f"{ordinal // 4}-Q{ordinal % 4 + 1}"
+
+
+def compute(reports, horizon=FORECAST_QUARTERS):
+    # reports: financial_store rows, oldest first. Everything is aligned on one continuous quarterly axis
+    reports = [report for report in reports if report.get("fiscal_date_ending")]
+    if not reports:
+        return None
+    ordinals = _quarter_ordinals(reports)
+    first, last = int(ordinals.min()), int(ordinals.max())
+    axis = np.arange(first, last + 1)
+    positions = ordinals - first
+
+    series = {}
+    for name, field in FIELDS.items():
+        column = np.full(len(axis), np.nan)
+        raw = np.array([report.get(field, np.nan) for report in reports], dtype=float)
+        # Later rows win when two reports land in the same quarter
+        column[positions] = raw
+        series[name] = column
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        revenue = np.where(series["revenue"] > 0, series["revenue"], np.nan)
+        margins = {name: series[source] / revenue * 100 for name, source in MARGINS.items()}
+
+    result = {
+        "version": ANALYTICS_VERSION,
+        "currency": reports[-1].get("reported_currency"),
+        "periods": [_label(ordinal) for ordinal in axis],
+        "series": {name: _round(values) for name, values in series.items()},
+        "qoq_pct": {name: _round(_pct_change(series[name], 1)) for name in FORECAST_SERIES},
+        "yoy_pct": {name: _round(_pct_change(series[name], 4)) for name in FORECAST_SERIES},
+        "ttm": {name: _round(_trailing_sum(series[name])) for name in FORECAST_SERIES},
+        "margins_pct": {name: _round(values) for name, values in margins.items()},
+        "forecast": None,
+    }
+    forecasts = {name: _forecast(axis, series[name], horizon) for name in FORECAST_SERIES}
+    if any(forecasts.values()):
+        result["forecast"] = {
+            "periods": [_label(ordinal) for ordinal in range(last + 1, last + 1 + horizon)],
+            "confidence": FORECAST_CONFIDENCE,
+            **forecasts,
+        }
+    return result
+
+
+def get_analytics(symbol, reports):
+    if not reports:
+        return None
+    key = f"analytics:v{ANALYTICS_VERSION}:{symbol}:{len(reports)}:{reports[-1]['fiscal_date_ending']}"
+    cached = analytics_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    analytics = compute(reports)
+    if analytics is not None:
+        analytics_cache.set(key, analytics, FINANCIALS_CACHE_TTL)
+    return analytics
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+# Columns of Alpha Vantage INCOME_STATEMENT reports; unseen fields are added as they appear
+STATEMENT_FIELDS = [
+    "grossProfit", "totalRevenue", "costOfRevenue", "costofGoodsAndServicesSold", "operatingIncome",
+    "sellingGeneralAndAdministrative", "researchAndDevelopment", "operatingExpenses", "investmentIncomeNet",
+    "netInterestIncome", "interestIncome", "interestExpense", "nonInterestIncome", "otherNonOperatingIncome",
+    "depreciation", "depreciationAndAmortization", "incomeBeforeTax", "incomeTaxExpense", "interestAndDebtExpense",
+    "netIncomeFromContinuingOperations", "comprehensiveIncomeNetOfTax", "ebit", "ebitda", "netIncome",
+]
+
+# A quarter is usually filed within ~45 days of its end; after that, check at most once a day
+FILING_LAG = timedelta(days=45)
+QUARTER_LENGTH = timedelta(days=92)
+RECHECK_INTERVAL = 24 * 3600
+
+
+def _to_number(value):
+    if value in (None, "", "None"):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class FinancialStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # WAL: every API worker on the host shares this file. Callers on the event loop go through
+        # asyncio.to_thread, so waiting out another worker's write doesn't stall it
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.row_factory = sqlite3.Row
+        columns = ", ".join(f'"{field}" REAL' for field in STATEMENT_FIELDS)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quarterly_reports ("
+            "symbol TEXT NOT NULL, fiscal_date_ending TEXT NOT NULL, reported_currency TEXT, "
+            f"{columns}, PRIMARY KEY (symbol, fiscal_date_ending))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS symbols ("
+            "symbol TEXT PRIMARY KEY, last_fiscal_date TEXT, checked_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._load_columns()
+
+    def _load_columns(self):
+        self._columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(quarterly_reports)")}
+
+    def _ensure_columns(self, fields):
+        for field in fields:
+            if field not in self._columns and field.isidentifier():
+                try:
+                    self._conn.execute(f'ALTER TABLE quarterly_reports ADD COLUMN "{field}" REAL')
+                except sqlite3.OperationalError as e:
+                    # Another worker added it since we last looked
+                    if "duplicate column" not in str(e):
+                        raise
+                    self._load_columns()
+                self._columns.add(field)
+
+    def upsert_reports(self, symbol, reports):
+        with self._lock:
+            fields = {key for report in reports for key in report} - {"fiscalDateEnding", "reportedCurrency"}
+            self._ensure_columns(sorted(fields))
+            for report in reports:
+                fiscal_date = report.get("fiscalDateEnding")
+                if not fiscal_date:
+                    continue
+                values = {key: _to_number(value) for key, value in report.items() if key in self._columns}
+                names = ["symbol", "fiscal_date_ending", "reported_currency", *values]
+                placeholders = ", ".join("?" for _ in names)
+                quoted = ", ".join(f'"{name}"' for name in names)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO quarterly_reports ({quoted}) VALUES ({placeholders})",
+                    (symbol, fiscal_date, report.get("reportedCurrency"), *values.values())
+                )
+            (last_fiscal_date,) = self._conn.execute(
+                "SELECT MAX(fiscal_date_ending) FROM quarterly_reports WHERE symbol = ?", (symbol,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO symbols (symbol, last_fiscal_date, checked_at) VALUES (?, ?, ?)",
+                (symbol, last_fiscal_date, time.time())
+            )
+            self._conn.commit()
+
+    def get_reports(self, symbol):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM quarterly_reports WHERE symbol = ? ORDER BY fiscal_date_ending", (symbol,)
+            ).fetchall()
+        return [{key: row[key] for key in row.keys() if row[key] is not None} for row in rows]
+
+    def refresh_due(self, symbol, today=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_fiscal_date, checked_at FROM symbols WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        if row is None:
+            return True
+        if time.time() - row["checked_at"] < RECHECK_INTERVAL:
+            return False
+        if row["last_fiscal_date"] is None:
+            return True
+        today = today or date.today()
+        expected = date.fromisoformat(row["last_fiscal_date"]) + QUARTER_LENGTH + FILING_LAG
+        return today >= expected
@@ -1,13 +1,332 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
 
-from summarizer.config import GEMINI_API_KEY
+from summarizer.config import (
+    DISABLED_PROVIDERS, GEMINI_API_KEY, GEMINI_BREAKER_RESET, GEMINI_BREAKER_THRESHOLD, GEMINI_MAX_CONCURRENCY,
+    GEMINI_MAX_RETRIES, GEMINI_STRUCTURED_OUTPUT, GEMINI_TIMEOUT, PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_STALE_TTL,
+    PROFILE_CACHE_TTL
+)
+from summarizer.utils import metrics
+from summarizer.utils.cache import MISSING, build_cache
+from summarizer.utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from summarizer.utils.entity import normalize_entity
+from summarizer.utils.logger import logger
+from summarizer.utils.singleflight import SingleFlight
 
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel("models/gemini-2.0-flash")
+MODEL_NAME = "models/gemini-2.0-flash"
 
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 10.0
 
-def get_company_profile(entity: str) -> str:
-    prompt = f"""
+
+def _load_model():
+    # The SDK is most of the API's import time, so it is only imported by warm-up or the first call
+    import google.generativeai as genai
+
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(MODEL_NAME)
+
+
+def _retryable_errors():
+    # Only consulted once a call has been made, by which point the SDK (and api_core) is loaded anyway
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+    )
+
+
+def _throttle_errors():
+    from google.api_core import exceptions as google_exceptions
+
+    return google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted
+
+
+profile_cache = build_cache("gemini_cache", min(PROFILE_CACHE_MAX_ENTRIES, 1024), PROFILE_CACHE_MAX_ENTRIES)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_background = set()
+# One Gemini call per entity at a time, whichever path asks: generate calls by cache key, streams below
+_profile_flight = SingleFlight()
+_streams = {}
+
+
+class GeminiError(Exception):
+    pass
+
+
+class GeminiUnavailable(GeminiError):
+    pass
+
+
+class SharedStream:
+    # A stream read by every concurrent caller for one entity: each replays the chunks so far, then follows along
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._updated = asyncio.Event()
+
+    def publish(self, text=None):
+        if text is not None:
+            self.chunks.append(text)
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        self.publish()
+
+    async def follow(self):
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._updated.wait()
+
+    async def text(self):
+        async for _ in self.follow():
+            pass
+        return "".join(self.chunks)
+
+
+class GeminiClient:
+    def __init__(self, model_factory, max_concurrency, timeout, max_retries, breaker, disabled=None):
+        self._model = None
+        self._model_factory = model_factory
+        self._model_lock = threading.Lock()
+        # Reason the client refuses every call (missing credentials), or None
+        self.disabled = disabled
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._inflight = 0
+        self._latencies = deque(maxlen=512)
+        self.stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "timeouts": 0}
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._model_factory()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def warm_up(self):
+        if not self.disabled:
+            self.model
+
+    async def _load_model(self):
+        if self.disabled:
+            raise GeminiUnavailable(self.disabled)
+        if self._model is None:
+            # Off the event loop: the first load imports the SDK
+            await asyncio.to_thread(self.warm_up)
+
+    @staticmethod
+    def _backoff(attempt):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _remaining(deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return remaining
+
+    async def _acquire(self, deadline):
+        self._check_breaker()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self._remaining(deadline))
+        except BaseException:
+            # Timing out in our own queue says nothing about upstream health
+            self.breaker.release()
+            raise
+        finally:
+            self._waiting -= 1
+        self._inflight += 1
+        self.stats["calls"] += 1
+
+    def _release(self):
+        self._inflight -= 1
+        self._slots.release()
+
+    def _check_breaker(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpen as e:
+            metrics.UPSTREAM_ERRORS.inc(provider="gemini", kind="circuit_open")
+            raise GeminiUnavailable(str(e)) from None
+
+    def _record(self, started, error=None):
+        elapsed = time.monotonic() - started
+        self._latencies.append(elapsed * 1000)
+        if error is None:
+            metrics.UPSTREAM_LATENCY.observe(elapsed, provider="gemini", outcome="ok")
+            self.stats["succeeded"] += 1
+            self.breaker.record_success()
+        elif isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            metrics.UPSTREAM_LATENCY.observe(elapsed, provider="gemini", outcome="cancelled")
+            self.breaker.release()
+        else:
+            kind = "timeout" if isinstance(error, asyncio.TimeoutError) else error.__class__.__name__
+            metrics.UPSTREAM_LATENCY.observe(elapsed, provider="gemini", outcome="error")
+            metrics.UPSTREAM_ERRORS.inc(provider="gemini", kind=kind)
+            if isinstance(error, _throttle_errors()):
+                metrics.UPSTREAM_THROTTLES.inc(provider="gemini", source="upstream")
+            self.stats["failed"] += 1
+            if isinstance(error, asyncio.TimeoutError):
+                self.stats["timeouts"] += 1
+            if isinstance(error, (asyncio.TimeoutError, *_retryable_errors())):
+                self.breaker.record_failure()
+            else:
+                # Bad requests or blocked prompts say nothing about upstream health
+                self.breaker.release()
+
+    async def _retry_wait(self, attempt, error, deadline):
+        if attempt == self.max_retries or not isinstance(error, _retryable_errors()):
+            return False
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        self.stats["retries"] += 1
+        logger.warning("Gemini call failed: %s, retrying (attempt %d)", error, attempt + 1)
+        await asyncio.sleep(delay)
+        return True
+
+    async def generate(self, prompt, generation_config=None):
+        # One deadline covers queueing, every attempt and the backoff between them
+        await self._load_model()
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(deadline)
+            started = time.monotonic()
+            try:
+                try:
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt, generation_config=generation_config),
+                        timeout=self._remaining(deadline)
+                    )
+                    text = response.text
+                finally:
+                    self._release()
+            except BaseException as e:
+                self._record(started, e)
+                if isinstance(e, Exception) and await self._retry_wait(attempt, e, deadline):
+                    continue
+                if not isinstance(e, Exception) or isinstance(e, asyncio.TimeoutError):
+                    raise
+                raise GeminiError(str(e) or e.__class__.__name__) from e
+            self._record(started)
+            if not text:
+                raise GeminiError("No data retrieved from Gemini")
+            return text
+
+    async def stream(self, prompt):
+        await self._load_model()
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(deadline)
+            started = time.monotonic()
+            yielded = False
+            try:
+                try:
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt, stream=True), timeout=self._remaining(deadline)
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self._remaining(deadline))
+                        except StopAsyncIteration:
+                            break
+                        text = getattr(chunk, "text", "")
+                        if text:
+                            yielded = True
+                            yield text
+                finally:
+                    self._release()
+            except BaseException as e:
+                self._record(started, e)
+                # Once text has gone out a retry would duplicate it, so only failures before the first chunk retry
+                if not yielded and isinstance(e, Exception) and await self._retry_wait(attempt, e, deadline):
+                    continue
+                if not isinstance(e, Exception) or isinstance(e, asyncio.TimeoutError):
+                    raise
+                raise GeminiError(str(e) or e.__class__.__name__) from e
+            self._record(started)
+            return
+
+    def snapshot(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 1) if latencies else None
+
+        return {
+            **self.stats,
+            "disabled": self.disabled,
+            "model_loaded": self._model is not None,
+            "waiting": self._waiting,
+            "inflight": self._inflight,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "breaker": self.breaker.snapshot(),
+        }
+
+
+client = GeminiClient(
+    _load_model, GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT, GEMINI_MAX_RETRIES,
+    CircuitBreaker(GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_RESET),
+    disabled=(
+        f"Gemini is disabled: missing {', '.join(DISABLED_PROVIDERS['gemini'])}"
+        if "gemini" in DISABLED_PROVIDERS else None
+    )
+)
+
+
+# (key, heading) for the seven sections the prompt asks for, in report order
+PROFILE_SECTIONS = [
+    ("industry_sector", "Industry Sector"),
+    ("products_services", "Products or Services"),
+    ("recent_developments", "Recent Activities and Developments"),
+    ("official_website", "Official Website"),
+    ("key_financials", "Key Financial Information"),
+    ("leadership", "Leadership Team"),
+    ("clients_partnerships", "Major Clients and Partnerships"),
+]
+
+PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {key: {"type": "string"} for key, _ in PROFILE_SECTIONS},
+    "required": [key for key, _ in PROFILE_SECTIONS],
+}
+
+STRUCTURED_CONFIG = {"response_mime_type": "application/json", "response_schema": PROFILE_SCHEMA}
+
+
+def _build_prompt(entity: str) -> str:
+    return f"""
 Act as a professional analyst and provide a detailed company profile for **{entity}**.
 Include:
 1. Industry Sector
@@ -21,8 +340,177 @@ Include:
 Respond in clear markdown format with appropriate sections.
 Don't give extra response at the start like okay here is the summary, etc.
 """
+
+
+def _build_structured_prompt(entity: str) -> str:
+    fields = "\n".join(f'- "{key}": {heading}' for key, heading in PROFILE_SECTIONS)
+    return f"""
+Act as a professional analyst and provide a detailed company profile for **{entity}**.
+Respond with a JSON object with exactly these string fields, each holding that section as markdown
+without its heading (write "Not available" when unknown):
+{fields}
+"""
+
+
+# Editing the prompt or switching models changes every key, so old answers are never served for the new prompt
+PROMPT_HASH = hashlib.sha256(
+    (_build_structured_prompt("{entity}") if GEMINI_STRUCTURED_OUTPUT else _build_prompt("{entity}")).encode("utf-8")
+).hexdigest()[:16]
+
+
+def _cache_key(entity):
+    mode = "json" if GEMINI_STRUCTURED_OUTPUT else "md"
+    return f"profile:{MODEL_NAME}:{mode}:{PROMPT_HASH}:{normalize_entity(entity)}"
+
+
+def is_valid_profile(text):
+    return bool(text) and bool(text.strip())
+
+
+def parse_sections(raw):
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise GeminiError(f"Structured profile is not valid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise GeminiError("Structured profile is not a JSON object")
+    invalid = [key for key, _ in PROFILE_SECTIONS if not isinstance(data.get(key), str)]
+    if invalid:
+        raise GeminiError(f"Structured profile is missing sections: {', '.join(invalid)}")
+    return {key: data[key].strip() for key, _ in PROFILE_SECTIONS}
+
+
+def build_profile(text=None, sections=None):
+    # Markdown is converted once here; the PDF and the UI reuse the stored HTML and sections
+    import markdown
+
+    if sections is not None:
+        sections = [
+            {
+                "key": key,
+                "heading": heading,
+                "markdown": sections[key],
+                "html": markdown.markdown(sections[key], extensions=['tables']),
+            }
+            for key, heading in PROFILE_SECTIONS
+        ]
+        text = "\n\n".join(f"## {section['heading']}\n\n{section['markdown']}" for section in sections)
+        html = "\n".join(f"<h3>{section['heading']}</h3>\n{section['html']}" for section in sections)
+    else:
+        html = markdown.markdown(text, extensions=['tables', 'fenced_code'])
+    return {"text": text, "sections": sections, "html": html, "created_at": time.time()}
+
+
+def store_profile(entity, profile):
+    if not is_valid_profile(profile["text"]):
+        return
+    profile_cache.set(_cache_key(entity), profile, PROFILE_CACHE_TTL + PROFILE_CACHE_STALE_TTL)
+
+
+def profile_entry(entity):
+    entry = profile_cache.get(_cache_key(entity))
+    return None if entry is MISSING else entry
+
+
+def cached_profile(entity):
+    # Fresh entries are returned as is; stale ones are returned too while a background refresh replaces them
+    entry = profile_entry(entity)
+    if entry is None:
+        return None
+    if time.time() - entry["created_at"] > PROFILE_CACHE_TTL:
+        _revalidate(entity)
+    return entry
+
+
+def _revalidate(entity):
+    key = _cache_key(entity)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    async def refresh():
+        try:
+            store_profile(entity, await _generate_profile(entity))
+        except Exception as e:
+            logger.warning("Background profile refresh for %s failed: %s", entity, e)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _spawn(refresh())
+
+
+def _spawn(coro):
+    # Keeps a reference so the task isn't garbage collected while nobody awaits it
+    task = asyncio.get_running_loop().create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _generate_profile(entity):
+    if GEMINI_STRUCTURED_OUTPUT:
+        raw = await client.generate(_build_structured_prompt(entity), generation_config=STRUCTURED_CONFIG)
+        return build_profile(sections=parse_sections(raw))
+    return build_profile(text=await client.generate(_build_prompt(entity)))
+
+
+async def _generate_and_store(entity):
+    profile = await _generate_profile(entity)
+    store_profile(entity, profile)
+    return profile
+
+
+async def get_profile(entity: str) -> dict:
+    # Raises GeminiError (GeminiUnavailable while the breaker is open) or asyncio.TimeoutError
+    cached = cached_profile(entity)
+    if cached is not None:
+        return cached
+    key = _cache_key(entity)
+    stream = _streams.get(key)
+    if stream is not None:
+        # A stream for this entity is already running: take its text instead of making a second call
+        text = await stream.text()
+        if not is_valid_profile(text):
+            raise GeminiError("No data retrieved from Gemini")
+        return profile_entry(entity) or build_profile(text=text)
+    return await _profile_flight.do(key, lambda: _generate_and_store(entity))
+
+
+async def get_company_profile(entity: str) -> str:
+    return (await get_profile(entity))["text"]
+
+
+async def stream_company_profile(entity: str):
+    # Yields markdown fragments as Gemini produces them; errors propagate to the caller
+    if GEMINI_STRUCTURED_OUTPUT:
+        # Partial JSON is not displayable, so structured profiles arrive in one piece
+        yield await get_company_profile(entity)
+        return
+    key = _cache_key(entity)
+    if key in _profile_flight:
+        # get_profile is already generating this entity; wait for it rather than stream a second copy
+        yield (await get_profile(entity))["text"]
+        return
+    stream = _streams.get(key)
+    if stream is None:
+        # The first caller starts the stream in the background, so it keeps going if that client disconnects
+        stream = _streams[key] = SharedStream()
+        _spawn(_drive_stream(entity, key, stream))
+    async for text in stream.follow():
+        yield text
+
+
+async def _drive_stream(entity, key, stream):
     try:
-        response = gemini_model.generate_content(prompt)
-        return getattr(response, "text", "No data retrieved from Gemini.")
-    except Exception as e:
-        return f"Error generating profile: {str(e)}"
+        async for text in client.stream(_build_prompt(entity)):
+            stream.publish(text)
+        store_profile(entity, build_profile(text="".join(stream.chunks)))
+        stream.finish()
+    except BaseException as e:
+        stream.finish(e)
+        if not isinstance(e, Exception):
+            raise
+    finally:
+        if _streams.get(key) is stream:
+            del _streams[key]
@@ -1,52 +1,235 @@
+import asyncio
 import re
+import time
+from datetime import date
+from urllib.parse import urlparse
 
-import requests
+import httpx
 
-from summarizer.config import GOOGLE_SEARCH_API_KEY, GOOGLE_CSE_ID
+from summarizer.config import (
+    DISABLED_PROVIDERS, DOCUMENT_SEARCH_DEADLINE, DOCUMENT_SEARCH_PAGES, DOCUMENTS_CACHE_TTL, DOCUMENTS_MAX_RESULTS,
+    DOCUMENTS_PER_YEAR, GOOGLE_CSE_ID, GOOGLE_CSE_MAX_CONCURRENCY, GOOGLE_CSE_REQUESTS_PER_DAY,
+    GOOGLE_CSE_REQUESTS_PER_MINUTE, GOOGLE_SEARCH_API_KEY, GOOGLE_SEARCH_URL, NEWS_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_STALE_TTL
+)
+from summarizer.services import http_client
+from summarizer.services.rate_limiter import QuotaExhausted, QuotaScheduler
+from summarizer.services.symbol_index import normalize_name
+from summarizer.utils import metrics
+from summarizer.utils.cache import MISSING, build_cache, build_counter
+from summarizer.utils.domain import extract_domain
+from summarizer.utils.entity import normalize_entity
+from summarizer.utils.logger import logger
+from summarizer.utils.singleflight import SingleFlight
 
+SEARCH_URL = GOOGLE_SEARCH_URL
 
-def fetch_news(entity):
-    params = {
-        "q": f"{entity} latest legal news and issues",
-        "key": GOOGLE_SEARCH_API_KEY,
-        "cx": GOOGLE_CSE_ID,
-        "num": 10
-    }
+# Query templates; the template name is part of the cache key, so editing one should come with a rename
+QUERY_TEMPLATES = {
+    "news": "{entity} latest legal news and issues",
+    "documents": "{entity} (\"annual report\" OR \"financial report\") filetype:pdf",
+}
+
+# 403/429 reasons that mean we are out of quota rather than misconfigured
+QUOTA_REASONS = {"dailyLimitExceeded", "rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+PAGE_SIZE = 10
+YEAR_PATTERN = re.compile(r"(?<!\d)(20\d{2})(?!\d)")
+# Filing archives that carry genuine reports even though they are not the company's own site
+FILING_DOMAINS = {"sec.gov", "annualreports.com", "companieshouse.gov.uk", "sedar.com", "bseindia.com", "nseindia.com"}
+
+# Custom Search's daily quota resets at midnight Pacific time
+quota = QuotaScheduler(
+    GOOGLE_CSE_REQUESTS_PER_MINUTE, GOOGLE_CSE_REQUESTS_PER_DAY, reset_timezone="America/Los_Angeles",
+    counter=build_counter("google_cse"), max_concurrency=GOOGLE_CSE_MAX_CONCURRENCY
+)
+search_cache = build_cache("search_cache", min(SEARCH_CACHE_MAX_ENTRIES, 2048), SEARCH_CACHE_MAX_ENTRIES)
+_search_flight = SingleFlight()
+stats = {"queries": 0, "fresh_hits": 0, "stale_served": 0}
+
+
+class SearchError(Exception):
+    pass
+
+
+class SearchQuotaExceeded(SearchError):
+    pass
+
+
+def _error_reasons(response):
+    try:
+        error = response.json().get("error", {})
+    except ValueError:
+        return set(), response.text[:200]
+    return {e.get("reason") for e in error.get("errors", [])}, error.get("message", "")
+
+
+async def _query(q, num=PAGE_SIZE, start=1):
+    if "google_cse" in DISABLED_PROVIDERS:
+        raise SearchError(f"Custom Search is disabled: missing {', '.join(DISABLED_PROVIDERS['google_cse'])}")
     try:
-        response = requests.get("https://www.googleapis.com/customsearch/v1", params=params)
-        data = response.json()
-        return [{"title": item["title"], "link": item["link"]} for item in data.get("items", [])]
-    except:
-        return []
-
-
-def fetch_documents(entity):
-    params = {
-        "q": f"{entity} (\"annual report\" OR \"financial report\") filetype:pdf",
-        "key": GOOGLE_SEARCH_API_KEY,
-        "cx": GOOGLE_CSE_ID,
-        "num": 10
-    }
-
-    docs = []
+        await quota.acquire()
+    except QuotaExhausted as e:
+        metrics.UPSTREAM_THROTTLES.inc(provider="google_cse", source="local_quota")
+        raise SearchQuotaExceeded(f"Custom Search quota exhausted: {e}")
+
+    params = {"q": q, "key": GOOGLE_SEARCH_API_KEY, "cx": GOOGLE_CSE_ID, "num": num}
+    if start > 1:
+        params["start"] = start
+    stats["queries"] += 1
     try:
-        response = requests.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=15)
-        response.raise_for_status()
-        items = response.json().get("items", [])
-    except Exception as e:
-        return []
+        # No transport-level retries: every attempt is a billed query, and a retried 429 only digs deeper
+        async with quota.in_flight():
+            response = await http_client.get(SEARCH_URL, params=params, retries=0)
+    except httpx.HTTPError as e:
+        raise SearchError(f"Custom Search request failed: {e}")
+
+    if response.status_code in (403, 429):
+        reasons, message = _error_reasons(response)
+        if "dailyLimitExceeded" in reasons or response.status_code == 429 or reasons & QUOTA_REASONS:
+            metrics.UPSTREAM_THROTTLES.inc(provider="google_cse", source="upstream")
+        if "dailyLimitExceeded" in reasons:
+            quota.exhaust_day()
+            raise SearchQuotaExceeded(f"Custom Search daily quota exceeded: {message}")
+        if response.status_code == 429 or reasons & QUOTA_REASONS:
+            quota.record_throttle()
+            raise SearchQuotaExceeded(f"Custom Search quota exceeded: {message}")
+    if response.status_code >= 400:
+        _, message = _error_reasons(response)
+        raise SearchError(f"Custom Search returned {response.status_code}: {message}")
+    try:
+        return response.json().get("items", [])
+    except ValueError:
+        raise SearchError("Custom Search returned a non-JSON response")
+
+
+async def search(template, entity, ttl, start=1):
+    # Results are kept past their TTL so they can stand in while the quota is exhausted or CSE is failing
+    key = f"cse:{template}:{normalize_entity(entity)}"
+    if start > 1:
+        key = f"{key}:{start}"
+    entry = search_cache.get(key)
+    if entry is not MISSING and time.time() - entry["fetched_at"] < ttl:
+        stats["fresh_hits"] += 1
+        return entry["items"]
+
+    async def refresh():
+        items = await _query(QUERY_TEMPLATES[template].format(entity=entity), start=start)
+        search_cache.set(key, {"items": items, "fetched_at": time.time()}, ttl + SEARCH_CACHE_STALE_TTL)
+        return items
+
+    try:
+        # Concurrent requests for the same query share one CSE call
+        return await _search_flight.do(key, refresh)
+    except SearchError as e:
+        if entry is MISSING:
+            raise
+        stats["stale_served"] += 1
+        logger.warning("Serving stale %s results for %s: %s", template, entity, e)
+        return entry["items"]
+
+
+def snapshot():
+    return {**stats, "quota": quota.snapshot(), "cache": search_cache.snapshot()}
+
+
+async def fetch_news(entity):
+    # Raises SearchError / SearchQuotaExceeded when there is nothing cached to fall back on
+    items = await search("news", entity, NEWS_CACHE_TTL)
+    return [{"title": item["title"], "link": item["link"]} for item in items]
+
+
+def _normalize_url(link):
+    # Same document behind http/https, www., a trailing slash or tracking parameters counts once
+    domain = extract_domain(link) or ""
+    if domain.startswith("www."):
+        domain = domain[4:]
+    path = urlparse(link if "://" in link else f"https://{link}").path.rstrip("/").lower()
+    return domain, f"{domain}{path}"
+
+
+def _extract_year(title, link):
+    latest = date.today().year + 1
+    for text in (title, link):
+        years = [int(year) for year in YEAR_PATTERN.findall(text) if int(year) <= latest]
+        if years:
+            return str(max(years))
+    return "Unknown"
 
-    for item in items:
-        title = item.get("title", "Untitled Document")
-        link = item.get("link", "")
-        year_match = re.search(r"(20\d{2})", title) or re.search(r"(20\d{2})", link)
-        year = year_match.group(1) if year_match else "Unknown"
 
-        docs.append({
+def _entity_labels(entity):
+    # Domain labels that mark the company's own site: a word of its name or the whole name run together.
+    # Legal suffixes ("inc", "group", ...) are already gone and would match unrelated domains
+    name = normalize_name(entity)
+    return {token for token in name.split() if len(token) > 2} | {name.replace(" ", "")}
+
+
+def _is_official(domain, labels):
+    # Whole labels only: "ford" must not match stanford.edu, nor "meta" metacritic.com
+    return any(label.replace("-", "") in labels for label in domain.split("."))
+
+
+def _rank_documents(entity, pages):
+    labels = _entity_labels(entity)
+    docs = {}
+    for position, item in enumerate(item for page in pages for item in page):
+        link = item.get("link", "")
+        if not link:
+            continue
+        domain, url_key = _normalize_url(link)
+        if url_key in docs:
+            continue
+        official = _is_official(domain, labels)
+        filing = any(domain == site or domain.endswith(f".{site}") for site in FILING_DOMAINS)
+        title = item.get("title", "Untitled Document")
+        docs[url_key] = {
             "title": title,
             "link": link,
-            "year": year
-        })
+            "year": _extract_year(title, link),
+            "domain": domain,
+            "official": official,
+            # Official site first, then filing archives, then CSE's own order across pages
+            "_rank": (0 if official else 1 if filing else 2, position),
+        }
+
+    buckets = {}
+    for doc in sorted(docs.values(), key=lambda d: d["_rank"]):
+        buckets.setdefault(doc["year"], []).append(doc)
+
+    years = sorted((year for year in buckets if year != "Unknown"), reverse=True)
+    if "Unknown" in buckets:
+        years.append("Unknown")
+    ranked = [
+        {k: v for k, v in doc.items() if k != "_rank"}
+        for year in years for doc in buckets[year][:DOCUMENTS_PER_YEAR]
+    ]
+    return ranked[:DOCUMENTS_MAX_RESULTS]
+
+
+async def fetch_documents(entity):
+    # Later pages are only worth their quota cost while plenty of the daily budget is left
+    pages = DOCUMENT_SEARCH_PAGES if quota.remaining_today() > DOCUMENT_SEARCH_PAGES * 4 else 1
+    tasks = [
+        asyncio.create_task(search("documents", entity, DOCUMENTS_CACHE_TTL, start=1 + page * PAGE_SIZE))
+        for page in range(pages)
+    ]
+    # One deadline for every page: whatever has arrived by then is ranked, the rest is dropped
+    done, pending = await asyncio.wait(tasks, timeout=DOCUMENT_SEARCH_DEADLINE)
+    for task in pending:
+        task.cancel()
 
-    docs.sort(key=lambda d: int(d["year"]) if d["year"].isdigit() else 0, reverse=True)
-    return docs[:5]
+    results = []
+    errors = []
+    for task in tasks:
+        if task not in done:
+            continue
+        if task.exception() is not None:
+            errors.append(task.exception())
+        else:
+            results.append(task.result())
+    if not results:
+        # Nothing to rank: surface the reason (quota, upstream error, or the deadline)
+        raise errors[0] if errors else asyncio.TimeoutError()
+    for error in errors:
+        logger.warning("Document search page failed for %s: %s", entity, error)
+    return _rank_documents(entity, results)
@@ -0,0 +1,99 @@
+import asyncio
+import random
+import threading
+from urllib.parse import urlparse
+
+import httpx
+
+from summarizer.config import ALPHAVANTAGE_URL, GOOGLE_SEARCH_URL
+from summarizer.utils import metrics
+from summarizer.utils.logger import logger
+
+# Pool and timeout settings per upstream host; anything else uses DEFAULT_HOST_SETTINGS
+HOST_SETTINGS = {
+    "www.googleapis.com": {"timeout": 15.0, "max_connections": 20},
+    "www.alphavantage.co": {"timeout": 10.0, "max_connections": 5},
+}
+DEFAULT_HOST_SETTINGS = {"timeout": 10.0, "max_connections": 10}
+# Provider label used in metrics; other hosts are labelled by hostname
+PROVIDERS = {urlparse(GOOGLE_SEARCH_URL).netloc: "google_cse", urlparse(ALPHAVANTAGE_URL).netloc: "alphavantage"}
+
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_clients = {}
+_semaphores = {}
+# Clients are built by warm-up on a worker thread or by the first request on the event loop
+_clients_lock = threading.Lock()
+
+
+def _host_settings(host):
+    return HOST_SETTINGS.get(host, DEFAULT_HOST_SETTINGS)
+
+
+def _get_client(host):
+    client = _clients.get(host)
+    if client is not None and not client.is_closed:
+        return client
+    with _clients_lock:
+        client = _clients.get(host)
+        if client is not None and not client.is_closed:
+            return client
+        settings = _host_settings(host)
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings["timeout"]),
+            limits=httpx.Limits(
+                max_connections=settings["max_connections"],
+                max_keepalive_connections=settings["max_connections"],
+                keepalive_expiry=60.0
+            ),
+            follow_redirects=True
+        )
+        _clients[host] = client
+        _semaphores[host] = asyncio.Semaphore(settings["max_connections"])
+    return client
+
+
+def _backoff(attempt):
+    # Full jitter: sleep a random amount up to the exponential cap
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+async def get(url, params=None, timeout=None, retries=MAX_RETRIES):
+    host = urlparse(url).netloc
+    client = _get_client(host)
+    semaphore = _semaphores[host]
+    provider = PROVIDERS.get(host, host)
+
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                with metrics.UPSTREAM_LATENCY.time(provider=provider, outcome="transport_error") as labels:
+                    response = await client.get(url, params=params, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
+                    labels["outcome"] = f"{response.status_code // 100}xx"
+            if response.status_code >= 400:
+                metrics.UPSTREAM_ERRORS.inc(provider=provider, kind=f"http_{response.status_code}")
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            logger.warning("GET %s returned %s, retrying (attempt %d)", host, response.status_code, attempt + 1)
+        except httpx.TransportError as e:
+            metrics.UPSTREAM_ERRORS.inc(provider=provider, kind="transport")
+            if attempt == retries:
+                raise
+            logger.warning("GET %s failed: %s, retrying (attempt %d)", host, e, attempt + 1)
+        await asyncio.sleep(_backoff(attempt))
+
+
+def warm_up():
+    # Building a client loads the TLS trust store, which is most of its cost
+    for host in HOST_SETTINGS:
+        _get_client(host)
+
+
+async def shutdown():
+    clients = list(_clients.values())
+    _clients.clear()
+    _semaphores.clear()
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
@@ -1,35 +1,24 @@
-import os
+import importlib
+import threading
+import time
 from datetime import datetime
 
-import PyPDF2
-import markdown
-import pdfkit
-from jinja2 import Environment
+from summarizer.config import PDF_CACHE_DIR, PDF_CACHE_MAX_AGE, PDF_CACHE_MAX_BYTES
+from summarizer.services import pdf_renderer
+from summarizer.services.report_cache import ReportCache
+from summarizer.utils.logger import logger
 
-config = pdfkit.configuration(wkhtmltopdf=r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe')
-def generate_pdf(entity, summary, news, metrics):
-    # Format entity name and create filenames
-    entity_title = " ".join(word.capitalize() for word in entity.split())
-    base_filename = f"{entity.replace(' ', '_')}_summary_{datetime.now().strftime('%Y%m%d')}"
-    summary_dir = "summaries"
-    temp_dir = os.path.join(summary_dir, "temp")
-    os.makedirs(temp_dir, exist_ok=True)
-
-    temp_html = os.path.join(temp_dir, f"temp_{base_filename}.html")
-    output_pdf = os.path.join(temp_dir, f"{base_filename}.pdf")
-    final_pdf = os.path.join(summary_dir, f"{base_filename}_final.pdf")
-
-
-    # Convert markdown to HTML
-    html_content = markdown.markdown(summary, extensions=['tables', 'fenced_code'])
+# Bump whenever REPORT_TEMPLATE or the rendering options change so cached PDFs are not reused
+TEMPLATE_VERSION = 1
 
-    # Create HTML using Jinja2 template string
-    template_str = """
+REPORT_TEMPLATE = """
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
-        <title>{{ entity_title }} - Company Summary</title>
+        <title>{{ entity_title }} Company Summary Report</title>
+        <meta name="author" content="Report Generator">
+        <meta name="dcterms.created" content="{{ created }}">
         <style>
             @page {
                 size: letter portrait;
@@ -147,99 +136,106 @@ def generate_pdf(entity, summary, news, metrics):
     </body>
     </html>
     """
-    def format_metric(v):
-        try:
-            v = float(v)
-            if v >= 1e9:
-                return f"{v / 1e9:.2f}B USD"
-            elif v >= 1e6:
-                return f"{v / 1e6:.2f}M USD"
-            elif v >= 1e3:
-                return f"{v / 1e3:.2f}K USD"
-            else:
-                return f"{v:.2f}"
-        except:
-            return str(v)
 
+# Compiled once per process instead of on every report, on first use or at warm-up
+_template = None
+_template_lock = threading.Lock()
+
+report_cache = ReportCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, PDF_CACHE_MAX_AGE, legacy_dir="summaries")
+
+
+def format_metric(v):
+    try:
+        v = float(v)
+        if v >= 1e9:
+            return f"{v / 1e9:.2f}B USD"
+        elif v >= 1e6:
+            return f"{v / 1e6:.2f}M USD"
+        elif v >= 1e3:
+            return f"{v / 1e3:.2f}K USD"
+        else:
+            return f"{v:.2f}"
+    except:
+        return str(v)
+
+
+def _report_template():
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                from jinja2 import Environment
+
+                _template = Environment().from_string(REPORT_TEMPLATE)
+    return _template
+
+
+def warm_up():
+    importlib.import_module("markdown")
+    _report_template()
+    # Also the first cache sweep, which clears out what older versions left under summaries/
+    report_cache.gc()
+
+
+def render_html(entity, summary, news, metrics, summary_html=None, now=None):
+    import markdown
+
+    entity_title = " ".join(word.capitalize() for word in entity.split())
+    # Profiles from gemini_service come with their HTML already rendered; convert markdown only as a fallback
+    html_content = summary_html or markdown.markdown(summary, extensions=['tables', 'fenced_code'])
     formatted_metrics = {k: format_metric(v) for k, v in (metrics or {}).items()}
-    # Create Jinja2 environment and render template
-    env = Environment()
-    template = env.from_string(template_str)
-    rendered_html = template.render(
+    now = now or datetime.now()
+    return _report_template().render(
         entity_title=entity_title,
         html_content=html_content,
         metrics=formatted_metrics,
         news=news or [],
-        today=datetime.now().strftime("%B %d, %Y")
+        today=now.strftime("%B %d, %Y"),
+        created=now.isoformat(timespec="seconds")
     )
 
-    # Save HTML file temporarily
-    with open(temp_html, 'w', encoding='utf-8') as f:
-        f.write(rendered_html)
-
-    # Configure PDF options
-    options = {
-        'page-size': 'Letter',
-        'margin-top': '0.75in',
-        'margin-right': '0.75in',
-        'margin-bottom': '0.75in',
-        'margin-left': '0.75in',
-        'encoding': 'UTF-8',
-        'no-outline': None,
-        'quiet': '',
-    }
-
-    # Convert HTML to PDF using pdfkit
+
+def report_key(entity, summary, news, metrics, day=None):
+    entity_title = " ".join(word.capitalize() for word in entity.split())
+    formatted_metrics = {k: format_metric(v) for k, v in (metrics or {}).items()}
+    # The report prints its generation date, so a PDF is only reused on the day it was rendered
+    day = (day or datetime.now().date()).isoformat()
+    return report_cache.key_for(TEMPLATE_VERSION, entity_title, summary, news or [], formatted_metrics, day)
+
+
+def generate_pdf(entity, summary, news, metrics, summary_html=None, timings=None):
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+
+    # Same inputs on the same day, same PDF: reuse the stored file instead of rendering again
+    now = datetime.now()
+    key = report_key(entity, summary, news, metrics, now.date())
+    cached = report_cache.lookup(key)
+    if cached:
+        timings["cache"] = "hit"
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return cached
+    timings["cache"] = "miss"
+
+    entity_title = " ".join(word.capitalize() for word in entity.split())
+    rendered_html = render_html(entity, summary, news, metrics, summary_html, now)
+    timings["html_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    # Metadata is set by the renderer (title option / HTML meta tags), so there is no post-processing pass
     try:
-        pdfkit.from_file(temp_html, output_pdf, options=options,configuration=config)
+        pdf_bytes, render_timings = pdf_renderer.render(rendered_html, title=f"{entity_title} Company Summary Report")
+        timings.update(render_timings)
     except Exception as e:
-        print(f"Error generating PDF with pdfkit: {e}")
-        # If pdfkit fails, we can try an alternative like WeasyPrint
-        try:
-            from weasyprint import HTML
-            HTML(temp_html).write_pdf(output_pdf)
-        except Exception as e2:
-            print(f"Alternative PDF generation failed: {e2}")
-            return None
-
-    # Use PyPDF2 to add any additional processing if needed
-    # (like adding headers, footers, or merging with templates)
-    try:
-        # Read the generated PDF
-        reader = PyPDF2.PdfReader(output_pdf)
-        writer = PyPDF2.PdfWriter()
-
-        # Process each page (here we're just copying them as-is,
-        # but you could modify them if needed)
-        for page_num in range(len(reader.pages)):
-            page = reader.pages[page_num]
-            writer.add_page(page)
-
-        # Add metadata
-        writer.add_metadata({
-            "/Title": f"{entity_title} Company Summary Report",
-            "/Author": "Report Generator",
-            "/CreationDate": datetime.now().strftime("D:%Y%m%d%H%M%S"),
-            "/Producer": "PyPDF2"
-        })
-
-        # Save the final PDF
-        with open(final_pdf, "wb") as output_file:
-            writer.write(output_file)
-
-        # Clean up temporary files
-        try:
-            os.remove(temp_html)
-            os.remove(output_pdf)
-        except Exception as cleanup_error:
-            print(f"Cleanup failed: {cleanup_error}")
-
-
-        return final_pdf
+        logger.error("Error generating PDF: %s", e)
+        return None
 
-    except Exception as e:
-        print(f"Error in PyPDF2 processing: {e}")
-        # Return the original PDF if PyPDF2 processing fails
-        if os.path.exists(output_pdf):
-            return output_pdf
+    # Written once under its content hash, then swapped in atomically so readers never see a partial file
+    try:
+        path = report_cache.store(key, pdf_bytes)
+    except OSError as e:
+        logger.error("Error saving PDF: %s", e)
         return None
+
+    timings["bytes"] = len(pdf_bytes)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return path
@@ -0,0 +1,131 @@
+import multiprocessing
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from summarizer.config import PDF_ENGINE, PDF_RENDERER_POOL_SIZE, WKHTMLTOPDF_PATH
+from summarizer.utils.logger import logger
+
+PDF_OPTIONS = {
+    'page-size': 'Letter',
+    'margin-top': '0.75in',
+    'margin-right': '0.75in',
+    'margin-bottom': '0.75in',
+    'margin-left': '0.75in',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    'quiet': '',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+# Per-process engine handles, set up once by _init_worker
+_engines = None
+
+
+def _init_worker(engine, wkhtmltopdf):
+    # Import and configure the engines once per worker so each render starts warm
+    global _engines
+    _engines = {}
+    if engine in ("auto", "wkhtmltopdf") and wkhtmltopdf:
+        try:
+            import pdfkit
+            _engines["wkhtmltopdf"] = (pdfkit, pdfkit.configuration(wkhtmltopdf=wkhtmltopdf))
+        except (ImportError, OSError) as e:
+            logger.warning("wkhtmltopdf unavailable: %s", e)
+    if engine in ("auto", "weasyprint"):
+        try:
+            from weasyprint import HTML
+            _engines["weasyprint"] = HTML
+        except (ImportError, OSError) as e:
+            logger.warning("WeasyPrint unavailable: %s", e)
+
+
+def _warm():
+    return sorted(_engines or ())
+
+
+def _render_in_worker(html, title=None):
+    started = time.perf_counter()
+    errors = []
+    # WeasyPrint renders in-process and keeps the document metadata; wkhtmltopdf (a subprocess per render,
+    # title only) is the fallback
+    if "weasyprint" in _engines:
+        try:
+            # WeasyPrint takes title, author and creation date from the <title>/<meta> tags
+            pdf = _engines["weasyprint"](string=html).write_pdf()
+            return pdf, "weasyprint", (time.perf_counter() - started) * 1000
+        except Exception as e:
+            errors.append(f"weasyprint: {e}")
+    if "wkhtmltopdf" in _engines:
+        pdfkit, configuration = _engines["wkhtmltopdf"]
+        options = {**PDF_OPTIONS, "title": title} if title else PDF_OPTIONS
+        try:
+            # html goes in on stdin and the PDF comes back on stdout: no temp files
+            pdf = pdfkit.from_string(html, False, options=options, configuration=configuration)
+            return pdf, "wkhtmltopdf", (time.perf_counter() - started) * 1000
+        except Exception as e:
+            errors.append(f"wkhtmltopdf: {e}")
+    raise RuntimeError("; ".join(errors) or "No PDF engine available")
+
+
+def _engine_args():
+    return PDF_ENGINE, WKHTMLTOPDF_PATH or shutil.which("wkhtmltopdf")
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn, not fork: the API process has an event loop and threads running
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_RENDERER_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=_engine_args()
+            )
+        return _executor
+
+
+def render(html, title=None):
+    submitted = time.perf_counter()
+    if PDF_RENDERER_POOL_SIZE <= 0:
+        if _engines is None:
+            _init_worker(*_engine_args())
+        pdf, engine, render_ms = _render_in_worker(html, title)
+    else:
+        try:
+            pdf, engine, render_ms = _get_executor().submit(_render_in_worker, html, title).result()
+        except BrokenProcessPool:
+            _reset()
+            raise
+    total_ms = (time.perf_counter() - submitted) * 1000
+    return pdf, {
+        "engine": engine,
+        "render_ms": round(render_ms, 1),
+        "pool_wait_ms": round(max(total_ms - render_ms, 0.0), 1),
+    }
+
+
+def _reset():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def startup():
+    if PDF_RENDERER_POOL_SIZE <= 0:
+        return
+    executor = _get_executor()
+    # Spawn and warm every worker up front so the first reports don't pay for it
+    warmed = [executor.submit(_warm) for _ in range(PDF_RENDERER_POOL_SIZE)]
+    engines = {engine for future in warmed for engine in future.result()}
+    logger.info("PDF renderer pool ready: %d workers, engines: %s", PDF_RENDERER_POOL_SIZE, sorted(engines) or "none")
+
+
+def shutdown():
+    _reset()
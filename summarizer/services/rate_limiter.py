@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from summarizer.utils.cache import MemoryCounter
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Callers tag their work (batch jobs set BATCH); lower values are served first
+request_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+# How long a queued caller waits before asking again when the shared counter was busy
+RETRY_DELAY = 0.05
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class QuotaScheduler:
+    def __init__(
+        self, per_minute, per_day, throttle_cooldown=60.0, reset_timezone="UTC", counter=None, max_concurrency=None
+    ):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.throttle_cooldown = throttle_cooldown
+        # Daily quotas reset at midnight in the provider's timezone
+        self.reset_timezone = ZoneInfo(reset_timezone)
+        # Minute and day windows are counted in `counter` (cache.build_counter), so every worker on the
+        # shared backend spends one budget and a restart doesn't hand out a fresh day
+        self.counter = counter or MemoryCounter()
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._dispatcher = None
+        self.stats = {"granted": 0, "queued": 0, "throttled": 0, "rejected": 0}
+
+    def _today(self):
+        return datetime.now(self.reset_timezone).date()
+
+    def _day_key(self):
+        return f"day:{self._today().isoformat()}"
+
+    @staticmethod
+    def _minute_key():
+        # Wall-clock minutes, so every process agrees on the window
+        return f"minute:{int(time.time() // 60)}"
+
+    def _windows(self):
+        return [(self._minute_key(), self.per_minute, 120), (self._day_key(), self.per_day, 2 * 86400)]
+
+    def _reject_daily(self):
+        self.stats["rejected"] += 1
+        raise QuotaExhausted(f"Daily quota of {self.per_day} requests used up")
+
+    def _take(self):
+        # True when granted, False when the minute window is full (or the counter was busy)
+        full = self.counter.take(self._windows())
+        if full is None:
+            self.stats["granted"] += 1
+            return True
+        if full == self._day_key():
+            self._reject_daily()
+        return False
+
+    def _wait_time(self):
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self.counter.count(self._minute_key()) < self.per_minute:
+            return 0.0
+        return 60 - time.time() % 60
+
+    async def acquire(self, priority=None):
+        priority = request_priority.get() if priority is None else priority
+        if self.counter.count(self._day_key()) >= self.per_day:
+            self._reject_daily()
+        cooldown = self._paused_until - time.monotonic()
+        if cooldown > 0:
+            # Fail fast while upstream is throttling us so callers can fall back to cached data
+            self.stats["rejected"] += 1
+            raise QuotaExhausted(f"Upstream throttled, cooling down for {cooldown:.0f}s")
+        if not self._waiters and self._take():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.stats["queued"] += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    @contextlib.asynccontextmanager
+    async def in_flight(self):
+        # Caps requests actually on the wire. Entered after acquire(), so a caller still waiting for quota
+        # (or answered from a local fallback) never holds a slot
+        if self._slots is None:
+            yield
+            return
+        async with self._slots:
+            yield
+
+    async def _dispatch(self):
+        while self._waiters:
+            delay = self._wait_time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            future = self._waiters[0][2]
+            if future.done():
+                # The caller gave up (timeout or disconnect) while queued
+                heapq.heappop(self._waiters)
+                continue
+            try:
+                granted = self._take()
+            except QuotaExhausted as e:
+                heapq.heappop(self._waiters)
+                future.set_exception(e)
+                continue
+            if not granted:
+                # Another worker took the last slot of this minute, or the counter was busy
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+    def record_throttle(self):
+        # Upstream says we're over quota regardless of our own accounting: back off for a while
+        self.stats["throttled"] += 1
+        self._paused_until = time.monotonic() + self.throttle_cooldown
+
+    def remaining_today(self):
+        return max(self.per_day - self.counter.count(self._day_key()), 0)
+
+    def exhaust_day(self):
+        # Upstream says today's quota is gone: stop spending until the daily reset, in every worker
+        self.record_throttle()
+        self.counter.raise_to(self._day_key(), self.per_day, 2 * 86400)
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "used_this_minute": self.counter.count(self._minute_key()),
+            "used_today": self.counter.count(self._day_key()),
+            "daily_limit": self.per_day,
+            "waiting": sum(1 for _, _, future in self._waiters if not future.done()),
+            "paused_for": round(max(self._paused_until - time.monotonic(), 0.0), 1),
+        }
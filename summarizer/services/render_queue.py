@@ -0,0 +1,181 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+
+from summarizer.config import PDF_RENDER_QUEUE_SIZE, PDF_RENDER_WORKERS, REPORT_INDEX_PATH
+from summarizer.services import pdf_generator, pdf_renderer
+from summarizer.services.report_index import ReportIndex
+from summarizer.utils import metrics
+from summarizer.utils.logger import correlation_id, logger
+
+PENDING = "pending"
+RENDERING = "rendering"
+READY = "ready"
+FAILED = "failed"
+
+MAX_TRACKED_REPORTS = 1000
+# A pending render in the shared index older than this is assumed lost with the worker that queued it
+RENDER_STATUS_TTL = 300
+# How often /download re-reads the shared index while another worker renders
+STATUS_POLL_INTERVAL = 0.25
+
+# timings key -> stage label in summarizer_stage_duration_seconds
+RENDER_STAGES = {
+    "queued_ms": "pdf_queue_wait",
+    "html_ms": "pdf_html",
+    "pool_wait_ms": "pdf_pool_wait",
+    "render_ms": "pdf_render",
+    "total_ms": "pdf_total",
+}
+
+_queue = None
+_workers = []
+_reports = OrderedDict()
+_events = {}
+
+# Latest finished report per entity, persisted so /download survives restarts without scanning summaries/
+report_index = ReportIndex(REPORT_INDEX_PATH, legacy_dir="summaries")
+
+
+def _public(report):
+    return {k: v for k, v in report.items() if k != "args"}
+
+
+def submit(entity, summary, news, metrics, summary_html=None):
+    report = {
+        "id": uuid.uuid4().hex,
+        "entity": entity,
+        "status": PENDING,
+        "path": None,
+        "error": None,
+        "created_at": time.time(),
+        "finished_at": None,
+        "timings": None,
+        "request_id": correlation_id.get(),
+        "args": (entity, summary, news, metrics, summary_html),
+    }
+    _track(report)
+    _share(report_index.submit_render, report["entity"], report["id"], PENDING)
+    if _queue is None:
+        _finish(report, FAILED, error="Render queue is not running")
+    else:
+        try:
+            _queue.put_nowait(report["id"])
+        except asyncio.QueueFull:
+            _finish(report, FAILED, error="Render queue is full")
+    return _public(report)
+
+
+def _track(report):
+    _reports[report["id"]] = report
+    _events[report["id"]] = asyncio.Event()
+    while len(_reports) > MAX_TRACKED_REPORTS:
+        old_id, _ = _reports.popitem(last=False)
+        _events.pop(old_id, None)
+
+
+def _share(func, *args):
+    # The shared index only feeds other workers' /download; failing to update it must not fail the render
+    try:
+        func(*args)
+    except sqlite3.Error as e:
+        logger.warning("Could not update render status in the report index: %s", e)
+
+
+def _finish(report, status, path=None, error=None):
+    report.update(status=status, path=path, error=error, finished_at=time.time(), args=None)
+    _share(report_index.update_render, report["entity"], report["id"], status, error)
+    event = _events.get(report["id"])
+    if event is not None:
+        event.set()
+
+
+def get_report(report_id):
+    report = _reports.get(report_id)
+    return _public(report) if report else None
+
+
+async def wait_for_entity(entity, timeout):
+    # Latest render submitted for the entity by any worker, once it finishes or `timeout` runs out.
+    # This worker's own renders are awaited on their event; other workers' are polled in the shared index
+    deadline = time.monotonic() + timeout
+    while True:
+        render = await asyncio.to_thread(report_index.render_status, entity)
+        if render is None or render["status"] not in (PENDING, RENDERING):
+            return render
+        if time.time() - render["updated_at"] > RENDER_STATUS_TTL:
+            return None
+        if render["id"] in _events:
+            return await wait(render["id"], max(deadline - time.monotonic(), 0))
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return render
+        await asyncio.sleep(min(STATUS_POLL_INTERVAL, remaining))
+
+
+async def wait(report_id, timeout):
+    event = _events.get(report_id)
+    if event is not None:
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    return get_report(report_id)
+
+
+def queue_depth():
+    return _queue.qsize() if _queue else 0
+
+
+async def _worker():
+    while True:
+        report_id = await _queue.get()
+        report = _reports.get(report_id)
+        try:
+            if report is None or report["status"] != PENDING:
+                continue
+            report["status"] = RENDERING
+            await asyncio.to_thread(_share, report_index.update_render, report["entity"], report_id, RENDERING)
+            # Worker tasks outlive requests; log under the ID of the request that queued this report
+            correlation_id.set(report["request_id"])
+            report["timings"] = timings = {"queued_ms": round((time.time() - report["created_at"]) * 1000, 1)}
+            path = await asyncio.to_thread(pdf_generator.generate_pdf, *report["args"], timings=timings)
+            logger.info("Rendered report %s for %s: %s", report_id, report["entity"], timings)
+            _observe(timings, "ok" if path else "error")
+            if path:
+                await asyncio.to_thread(report_index.record, report["entity"], path)
+                _finish(report, READY, path=path)
+            else:
+                _finish(report, FAILED, error="Failed to generate PDF")
+        except Exception as e:
+            logger.exception("PDF render %s failed", report_id)
+            _finish(report, FAILED, error=str(e))
+        finally:
+            _queue.task_done()
+
+
+def _observe(timings, outcome):
+    if timings.get("cache") == "hit":
+        outcome = "cached"
+    for key, stage in RENDER_STAGES.items():
+        if key in timings:
+            metrics.STAGE_LATENCY.observe(timings[key] / 1000, stage=stage, outcome=outcome)
+
+
+async def startup():
+    global _queue
+    # The renderer pool is spawned by warm-up (see main.py) or by the first render
+    _queue = asyncio.Queue(maxsize=PDF_RENDER_QUEUE_SIZE)
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(PDF_RENDER_WORKERS))
+
+
+async def shutdown():
+    global _queue
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+    await asyncio.to_thread(pdf_renderer.shutdown)
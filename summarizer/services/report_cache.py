@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+GC_INTERVAL = 300
+STALE_TEMP_AGE = 3600
+
+
+def _is_legacy_report(name):
+    # Per-entity files ("<entity>_summary_<date>_final.pdf") written before reports were content-addressed
+    return "_summary_" in name and name.endswith(".pdf")
+
+
+class ReportCache:
+    def __init__(self, directory, max_bytes, max_age, legacy_dir=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Old per-entity reports are swept under the same age and size budget; their temp/ folder is
+        # no longer written to and goes on the first sweep
+        self.legacy_dir = legacy_dir
+        self._legacy_temp_removed = legacy_dir is None
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self._last_gc = 0.0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key_for(*parts):
+        # Stable hash of everything that shows up in the rendered report
+        payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def lookup(self, key):
+        path = self.path_for(key)
+        try:
+            # Touch on hit: mtime doubles as the LRU clock for garbage collection
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return path
+
+    def store(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key)
+        partial = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data)
+            due = (
+                self._total_bytes is None
+                or self._total_bytes > self.max_bytes
+                or time.time() - self._last_gc > GC_INTERVAL
+            )
+        if due:
+            self.gc(keep=path)
+        return path
+
+    def gc(self, keep=None):
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    if entry.name.endswith(".tmp"):
+                        # Leftovers from renders that died mid-write
+                        if now - stat.st_mtime > STALE_TEMP_AGE:
+                            self._remove(entry.path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            entries = []
+        entries.extend(self._legacy_entries())
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for mtime, size, path in entries:
+            if path == keep:
+                continue
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self._total_bytes = total
+            self._last_gc = now
+            self.stats["evictions"] += evicted
+        return evicted
+
+    def _legacy_entries(self):
+        if self.legacy_dir is None:
+            return []
+        if not self._legacy_temp_removed:
+            shutil.rmtree(os.path.join(self.legacy_dir, "temp"), ignore_errors=True)
+            self._legacy_temp_removed = True
+        entries = []
+        try:
+            with os.scandir(self.legacy_dir) as it:
+                for entry in it:
+                    if entry.is_file() and _is_legacy_report(entry.name):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
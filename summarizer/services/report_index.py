@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+import time
+
+from summarizer.utils.entity import normalize_entity
+
+
+def _etag_for(path, stat):
+    # Content-addressed reports are named after their hash; legacy files fall back to size and mtime
+    name = os.path.splitext(os.path.basename(path))[0]
+    if len(name) == 64 and all(c in "0123456789abcdef" for c in name):
+        return f'"{name}"'
+    return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+# Seconds an entry read from SQLite is answered from memory; other workers' renders show up after at most this
+MEMORY_TTL = 2.0
+
+
+class ReportIndex:
+    def __init__(self, path, legacy_dir=None):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Shared by every worker on the host: WAL keeps reads from waiting on another worker's write
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            "entity TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, "
+            "mtime REAL NOT NULL, etag TEXT NOT NULL)"
+        )
+        # Latest render submitted per entity and where it stands, so any worker can answer 202 for it
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS renders ("
+            "entity TEXT PRIMARY KEY, id TEXT NOT NULL, status TEXT NOT NULL, error TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        # entity -> (read at, entry); SQLite is the source of truth, this only absorbs repeated lookups
+        self._entries = {}
+        if legacy_dir and not len(self):
+            self._import_legacy(legacy_dir)
+
+    def _import_legacy(self, folder):
+        # One-time pass over per-entity files written before the index existed
+        latest = {}
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if "_summary_" in name and name.endswith(".pdf"):
+                entity = name.split("_summary_")[0].replace("_", " ")
+                latest[entity] = max(latest.get(entity, ""), name)
+        for entity, name in latest.items():
+            self.record(entity, os.path.join(folder, name))
+
+    def record(self, entity, path):
+        stat = os.stat(path)
+        entry = {
+            "entity": normalize_entity(entity),
+            "path": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "etag": _etag_for(path, stat),
+        }
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO reports (entity, path, size, mtime, etag) VALUES (?, ?, ?, ?, ?)",
+                    tuple(entry.values())
+                )
+            self._entries[entry["entity"]] = (time.monotonic(), entry)
+        return entry
+
+    def get(self, entity):
+        key = normalize_entity(entity)
+        cached = self._entries.get(key)
+        if cached is not None and time.monotonic() - cached[0] < MEMORY_TTL:
+            return cached[1]
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM reports WHERE entity = ?", (key,)).fetchone()
+            if row is None:
+                self._entries.pop(key, None)
+                return None
+            entry = dict(row)
+            self._entries[key] = (time.monotonic(), entry)
+        return entry
+
+    def discard(self, entity):
+        key = normalize_entity(entity)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM reports WHERE entity = ?", (key,))
+            self._entries.pop(key, None)
+
+    def submit_render(self, entity, report_id, status):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO renders (entity, id, status, error, updated_at) VALUES (?, ?, ?, NULL, ?)",
+                    (normalize_entity(entity), report_id, status, time.time())
+                )
+
+    def update_render(self, entity, report_id, status, error=None):
+        # Only the latest submission for the entity is tracked; a slower, older render doesn't overwrite it
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE renders SET status = ?, error = ?, updated_at = ? WHERE entity = ? AND id = ?",
+                    (status, error, time.time(), normalize_entity(entity), report_id)
+                )
+
+    def render_status(self, entity):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM renders WHERE entity = ?", (normalize_entity(entity),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
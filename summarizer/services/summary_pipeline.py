@@ -0,0 +1,261 @@
+import asyncio
+import json
+
+from summarizer.config import (
+    DOCUMENTS_TIMEOUT, FINANCIALS_CACHE_TTL, FINANCIALS_TIMEOUT, GEMINI_TIMEOUT, NEWS_TIMEOUT,
+    SUMMARY_CACHE_DISK_ENTRIES, SUMMARY_CACHE_MEMORY_ENTRIES, SYMBOL_CACHE_TTL
+)
+from summarizer.services import alpha_financials, gemini_service, google_search, render_queue
+from summarizer.utils import metrics
+from summarizer.utils.cache import MISSING, build_cache
+from summarizer.utils.entity import normalize_entity
+from summarizer.utils.logger import logger
+from summarizer.utils.singleflight import SingleFlight
+
+summarize_flight = SingleFlight()
+
+summary_cache = build_cache("summary_cache", SUMMARY_CACHE_MEMORY_ENTRIES, SUMMARY_CACHE_DISK_ENTRIES)
+
+
+class SummaryError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+async def _run_with_timeout(func, *args, timeout):
+    return await asyncio.wait_for(func(*args), timeout=timeout)
+
+
+async def _load_financials(sanitized):
+    # Resolution is local for known names, and remote lookups are shared with the "symbol" source
+    match = await alpha_financials.resolve_symbol(sanitized)
+    if not match or match["private"]:
+        return {}
+    return await alpha_financials.get_quarterly_financials(match["symbol"])
+
+
+async def _load_analytics(match):
+    # Runs after the "symbol" and "financial_data" sources, so the store is already refreshed and this
+    # only reads it: no Alpha Vantage call of its own
+    if not match or match["private"]:
+        return None
+    # Imported on first use: NumPy is not needed until a symbol resolves (main.py warms it up)
+    from summarizer.services import financial_analytics
+
+    with metrics.STAGE_LATENCY.time(stage="financial_analytics", outcome="ok") as labels:
+        try:
+            symbol = match["symbol"]
+            return await asyncio.to_thread(
+                lambda: financial_analytics.get_analytics(symbol, alpha_financials.get_statements(symbol))
+            )
+        except Exception:
+            labels["outcome"] = "error"
+            raise
+
+
+def _is_cacheable(result):
+    # Services swallow upstream failures into empty results; never pin those
+    return bool(result)
+
+
+def _source_table():
+    # name -> (loader, timeout, cache ttl, fallback on failure); a None ttl means the loader caches itself.
+    # Upstream concurrency caps live next to each provider's request (gemini_service.client,
+    # google_search._query, alpha_financials._query), so local lookups never wait for a slot
+    return {
+        "summary": (gemini_service.get_profile, GEMINI_TIMEOUT, None, None),
+        "official_news": (google_search.fetch_news, NEWS_TIMEOUT, None, []),
+        "official_documents": (google_search.fetch_documents, DOCUMENTS_TIMEOUT, None, []),
+        "symbol": (alpha_financials.resolve_symbol, FINANCIALS_TIMEOUT, SYMBOL_CACHE_TTL, None),
+        "financial_data": (_load_financials, FINANCIALS_TIMEOUT, FINANCIALS_CACHE_TTL, {}),
+    }
+
+
+def _profile_error_status(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return 504
+    if isinstance(error, gemini_service.GeminiUnavailable):
+        return 503
+    return 502
+
+
+def _describe_error(error, timeout):
+    if isinstance(error, asyncio.TimeoutError):
+        return f"Timed out after {timeout:g}s"
+    return str(error) or error.__class__.__name__
+
+
+def _latest_metrics(financial_data):
+    # Extract latest quarter metrics (optional, for PDF)
+    latest_year = max(financial_data.keys()) if financial_data else None
+    latest_q = max(financial_data[latest_year].keys()) if latest_year else None
+    latest = financial_data[latest_year][latest_q] if latest_q else {}
+    # Figures Alpha Vantage didn't report are left out of the PDF rather than printed as zero
+    return {name: value for name, value in latest.items() if value is not None}
+
+
+async def _fetch_source(name, func, sanitized, timeout, ttl):
+    with metrics.STAGE_LATENCY.time(stage=name, outcome="ok") as labels:
+        key = f"{name}:{normalize_entity(sanitized)}"
+        if ttl is not None:
+            cached = summary_cache.get(key)
+            if cached is not MISSING:
+                labels["outcome"] = "cached"
+                return cached
+        try:
+            result = await _run_with_timeout(func, sanitized, timeout=timeout)
+        except asyncio.TimeoutError:
+            labels["outcome"] = "timeout"
+            raise
+        except Exception:
+            labels["outcome"] = "error"
+            raise
+        if ttl is not None and _is_cacheable(result):
+            summary_cache.set(key, result, ttl)
+        return result
+
+
+async def summarize(sanitized, render=True):
+    # Concurrent requests for the same entity share one computation (and one PDF write). Batch work
+    # (render=False) gets its own flight so an interactive caller never joins a computation without a report
+    key = normalize_entity(sanitized) if render else f"{normalize_entity(sanitized)}:no-render"
+    return await summarize_flight.do(key, lambda: build_summary(sanitized, render))
+
+
+async def build_summary(sanitized, render=True):
+    sources = _source_table()
+    results = await asyncio.gather(
+        *(
+            _fetch_source(name, func, sanitized, timeout, ttl)
+            for name, (func, timeout, ttl, _) in sources.items()
+        ),
+        return_exceptions=True
+    )
+
+    data = {}
+    errors = {}
+    for (name, (_, timeout, _, fallback)), result in zip(sources.items(), results):
+        if isinstance(result, BaseException):
+            errors[name] = _describe_error(result, timeout)
+            logger.warning("Source %s failed for %s: %s", name, sanitized, errors[name])
+            result = fallback
+        data[name] = result
+
+    profile = data["summary"]
+    if profile is None:
+        status_code = _profile_error_status(dict(zip(sources, results))["summary"])
+        raise SummaryError(status_code, f"Error generating profile: {errors['summary']}")
+
+    financial_data = data["financial_data"]
+    try:
+        analytics = await _load_analytics(data["symbol"])
+    except Exception as e:
+        analytics = None
+        errors["financial_analytics"] = _describe_error(e, FINANCIALS_TIMEOUT)
+        logger.warning("Financial analytics failed for %s: %s", sanitized, errors["financial_analytics"])
+
+    # Rendering happens in the background; clients poll /reports/{id} or /download
+    report = None
+    if render:
+        report = render_queue.submit(
+            sanitized, profile["text"], data["official_news"], _latest_metrics(financial_data), profile["html"]
+        )
+
+    return {
+        "summary": profile["text"],
+        "summary_sections": profile["sections"],
+        "report": {"id": report["id"], "status": report["status"]} if report else None,
+        "official_news": data["official_news"],
+        "official_documents": data["official_documents"],
+        "financial_data": financial_data,
+        "financial_analytics": analytics,
+        "symbol": data["symbol"],
+        "errors": errors
+    }
+
+
+async def _stream_profile(sanitized):
+    cached = gemini_service.cached_profile(sanitized)
+    if cached is not None:
+        yield cached["text"]
+        return
+    # stream_company_profile caches the assembled profile once the stream completes
+    async for chunk in gemini_service.stream_company_profile(sanitized):
+        yield chunk
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def summary_events(sanitized):
+    # Every section is pushed onto one queue so events go out in completion order
+    events = asyncio.Queue()
+    data = {}
+
+    async def run_source(name, func, timeout, ttl, fallback):
+        try:
+            data[name] = await _fetch_source(name, func, sanitized, timeout, ttl)
+            await events.put((name, data[name]))
+        except Exception as e:
+            data[name] = fallback
+            await events.put(("error", {"source": name, "detail": _describe_error(e, timeout)}))
+
+    async def run_profile():
+        parts = []
+        with metrics.STAGE_LATENCY.time(stage="summary_stream", outcome="ok") as labels:
+            try:
+                async for chunk in _stream_profile(sanitized):
+                    parts.append(chunk)
+                    await events.put(("summary_chunk", chunk))
+                data["summary"] = "".join(parts)
+            except Exception as e:
+                labels["outcome"] = "error"
+                await events.put(("error", {"source": "summary", "detail": _describe_error(e, GEMINI_TIMEOUT)}))
+
+    sources = {
+        name: asyncio.create_task(run_source(name, func, timeout, ttl, fallback))
+        for name, (func, timeout, ttl, fallback) in _source_table().items() if name != "summary"
+    }
+
+    async def run_analytics():
+        # run_source never raises, so this just waits for both to settle
+        await asyncio.gather(sources["symbol"], sources["financial_data"])
+        try:
+            await events.put(("financial_analytics", await _load_analytics(data.get("symbol"))))
+        except Exception as e:
+            detail = _describe_error(e, FINANCIALS_TIMEOUT)
+            await events.put(("error", {"source": "financial_analytics", "detail": detail}))
+
+    tasks = [asyncio.create_task(run_profile()), *sources.values(), asyncio.create_task(run_analytics())]
+    pending = len(tasks)
+    for task in tasks:
+        task.add_done_callback(lambda _: events.put_nowait(None))
+
+    try:
+        while pending:
+            item = await events.get()
+            if item is None:
+                pending -= 1
+                continue
+            yield _sse(*item)
+
+        summary = data.get("summary")
+        if summary:
+            # The stream stored the finished profile; reuse its sections and pre-rendered HTML when it matches
+            profile = gemini_service.profile_entry(sanitized)
+            if profile and profile["text"] != summary:
+                profile = None
+            if profile and profile["sections"]:
+                yield _sse("summary_sections", profile["sections"])
+            latest = _latest_metrics(data.get("financial_data") or {})
+            report = render_queue.submit(
+                sanitized, summary, data.get("official_news") or [], latest, profile["html"] if profile else None
+            )
+            yield _sse("report", {"id": report["id"], "status": report["status"]})
+        yield _sse("done", {})
+    finally:
+        for task in tasks:
+            task.cancel()
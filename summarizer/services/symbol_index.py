@@ -0,0 +1,566 @@
+import bisect
+import json
+import os
+import re
+import threading
+
+from summarizer.utils.logger import logger
+
+PRIVATE = "PRIVATE"
+
+KNOWN_SYMBOLS = {
+    # Technology
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "amazon": "AMZN",
+    "meta": "META",
+    "facebook": "META",
+    "alphabet": "GOOGL",
+    "google": "GOOGL",
+    "tesla": "TSLA",
+    "netflix": "NFLX",
+    "nvidia": "NVDA",
+    "ibm": "IBM",
+    "oracle": "ORCL",
+    "intel": "INTC",
+    "cisco": "CSCO",
+    "adobe": "ADBE",
+    "salesforce": "CRM",
+    "amd": "AMD",
+    "qualcomm": "QCOM",
+    "paypal": "PYPL",
+    "twitter": "X",
+    "x": "X",
+    "snap": "SNAP",
+    "snapchat": "SNAP",
+    # E-commerce & Internet
+    "alibaba": "BABA",
+    "baidu": "BIDU",
+    "tencent": "TCEHY",
+    "jd.com": "JD",
+    "jd": "JD",
+    "pinduoduo": "PDD",
+    "pdd": "PDD",
+    "meituan": "MPNGF",
+    "mercadolibre": "MELI",
+    "coupang": "CPNG",
+    "rakuten": "RKUNY",
+    "sea limited": "SE",
+    "shopee": "SE",
+    "grab": "GRAB",
+    "gojek": "PRIVATE",
+    "tokopedia": "PRIVATE",
+    "flipkart": "WMT",  # Owned by Walmart
+    "ozon": "OZON",
+    "vk": "VKCO",
+    "mail.ru": "VKCO",
+    "naver": "035420.KS",
+    "kakao": "035720.KS",
+    "line": "LN",
+    "weibo": "WB",
+    "bytedance": "PRIVATE",
+    "tiktok": "PRIVATE",
+    "lazada": "BABA",  # Owned by Alibaba
+
+    # Software & SaaS
+    "sap": "SAP",
+    "atlassian": "TEAM",
+    "synopsys": "SNPS",
+    "cadence": "CDNS",
+    "ansys": "ANSS",
+    "autodesk": "ADSK",
+    "dassault systemes": "DASTY",
+    "siemens plm": "SIEGY",
+    "ptc": "PTC",
+    "bentley systems": "BSY",
+    "hubspot": "HUBS",
+    "zendesk": "PRIVATE",  # Taken private
+    "freshworks": "FRSH",
+    "zoho": "PRIVATE",
+    "slack": "CRM",  # Acquired by Salesforce
+    "tableau": "CRM",  # Acquired by Salesforce
+    "mulesoft": "CRM",  # Acquired by Salesforce
+    "zuora": "ZUO",
+    "coupa": "PRIVATE",  # Taken private
+    "qualtrics": "XM",
+    "smartsheet": "SMAR",
+    "asana": "ASAN",
+    "monday.com": "MNDY",
+    "monday": "MNDY",
+    "notion": "PRIVATE",
+    "zoom": "ZM",
+    "uber": "UBER",
+    "lyft": "LYFT",
+    "airbnb": "ABNB",
+    "roblox": "RBLX",
+    "spotify": "SPOT",
+    "palantir": "PLTR",
+    "dell": "DELL",
+    "hp": "HPQ",
+    "hewlett packard": "HPQ",
+    "broadcom": "AVGO",
+    "texas instruments": "TXN",
+    "ti": "TXN",
+    "micron": "MU",
+    "micron technology": "MU",
+    "intuit": "INTU",
+    "autodesk": "ADSK",
+    "electronic arts": "EA",
+    "ea": "EA",
+    "activision blizzard": "ATVI",
+    "unity": "U",
+    "unity software": "U",
+    "twilio": "TWLO",
+    "shopify": "SHOP",
+    "square": "SQ",
+    "block": "SQ",
+    "vmware": "VMW",
+    "servicenow": "NOW",
+    "workday": "WDAY",
+    "splunk": "SPLK",
+    "snowflake": "SNOW",
+    "datadog": "DDOG",
+    "crowdstrike": "CRWD",
+    "zscaler": "ZS",
+    "okta": "OKTA",
+    "palo alto networks": "PANW",
+    "fortinet": "FTNT",
+    "docusign": "DOCU",
+    "mongodb": "MDB",
+    "cloudflare": "NET",
+    "akamai": "AKAM",
+    "dropbox": "DBX",
+    "box": "BOX",
+    "juniper networks": "JNPR",
+    "juniper": "JNPR",
+    "ericsson": "ERIC",
+    "nokia": "NOK",
+    "netapp": "NTAP",
+    "western digital": "WDC",
+    "seagate": "STX",
+    "logitech": "LOGI",
+    "lenovo": "LNVGY",
+    "asus": "ASUUY",
+    "asustek": "ASUUY",
+
+    # IT Services & Consulting
+    "wipro": "WIT",
+    "infosys": "INFY",
+    "tata consultancy services": "TCS.NS",
+    "tcs": "TCS.NS",
+    "cognizant": "CTSH",
+    "accenture": "ACN",
+    "capgemini": "CAPMF",
+    "hcl technologies": "HCLTECH.NS",
+    "hcl": "HCLTECH.NS",
+    "tech mahindra": "TECHM.NS",
+    "ibm global services": "IBM",
+    "mindtree": "MINDTREE.NS",
+    "deloitte": "PRIVATE",
+    "pwc": "PRIVATE",
+    "ey": "PRIVATE",
+    "kpmg": "PRIVATE",
+    "cgi": "GIB",
+    "epam systems": "EPAM",
+    "epam": "EPAM",
+    "dxc technology": "DXC",
+    "dxc": "DXC",
+    "genpact": "G",
+    "luxoft": "LXFT",
+    "atos": "AEXAY",
+    "ntt data": "NTDTY",
+    "fujitsu": "FJTSY",
+    "cdw": "CDW",
+
+    # Semiconductor & Electronics
+    "taiwan semiconductor": "TSM",
+    "tsmc": "TSM",
+    "asml": "ASML",
+    "applied materials": "AMAT",
+    "lam research": "LRCX",
+    "kla": "KLAC",
+    "tokyo electron": "TOELY",
+    "arm holdings": "ARM",
+    "arm": "ARM",
+    "samsung electronics": "SSNLF",
+    "samsung": "SSNLF",
+    "lg electronics": "LGEIY",
+    "lg": "LGEIY",
+    "sony": "SONY",
+    "panasonic": "PCRFY",
+    "hitachi": "HTHIY",
+    "toshiba": "TOSYY",
+    "nxp semiconductors": "NXPI",
+    "nxp": "NXPI",
+    "stmicroelectronics": "STM",
+    "renesas": "RNECY",
+    "infineon": "IFNNY",
+    "analog devices": "ADI",
+    "marvell": "MRVL",
+    "mediatek": "2454.TW",
+    "xilinx": "AMD",  # Acquired by AMD
+    "altera": "INTC",  # Acquired by Intel
+
+    # Retail & Consumer
+    "walmart": "WMT",
+    "target": "TGT",
+    "costco": "COST",
+    "home depot": "HD",
+    "lowe's": "LOW",
+    "lowes": "LOW",
+    "mcdonald's": "MCD",
+    "mcdonalds": "MCD",
+    "starbucks": "SBUX",
+    "coca cola": "KO",
+    "coca-cola": "KO",
+    "coke": "KO",
+    "pepsi": "PEP",
+    "pepsico": "PEP",
+    "nike": "NKE",
+    "adidas": "ADDYY",
+    "lululemon": "LULU",
+    "chipotle": "CMG",
+    "domino's": "DPZ",
+    "dominos": "DPZ",
+    "yum brands": "YUM",
+    "kfc": "YUM",
+    "taco bell": "YUM",
+    "pizza hut": "YUM",
+    "etsy": "ETSY",
+    "ebay": "EBAY",
+    "wayfair": "W",
+    "dollar general": "DG",
+    "dollar tree": "DLTR",
+    "best buy": "BBY",
+    "tj maxx": "TJX",
+    "tjx": "TJX",
+
+    # Finance
+    "jpmorgan": "JPM",
+    "jp morgan": "JPM",
+    "bank of america": "BAC",
+    "bofa": "BAC",
+    "wells fargo": "WFC",
+    "citigroup": "C",
+    "citi": "C",
+    "goldman sachs": "GS",
+    "morgan stanley": "MS",
+    "american express": "AXP",
+    "amex": "AXP",
+    "visa": "V",
+    "mastercard": "MA",
+    "blackrock": "BLK",
+    "charles schwab": "SCHW",
+    "schwab": "SCHW",
+    "fidelity": "FNF",
+    "berkshire hathaway": "BRK.A",
+    "berkshire": "BRK.A",
+
+    # Healthcare & Pharma
+    "johnson & johnson": "JNJ",
+    "johnson and johnson": "JNJ",
+    "pfizer": "PFE",
+    "merck": "MRK",
+    "novartis": "NVS",
+    "abbvie": "ABBV",
+    "eli lilly": "LLY",
+    "lilly": "LLY",
+    "unitedhealth": "UNH",
+    "united health": "UNH",
+    "cvs": "CVS",
+    "walgreens": "WBA",
+    "moderna": "MRNA",
+    "gilead": "GILD",
+    "regeneron": "REGN",
+    "amgen": "AMGN",
+    "thermo fisher": "TMO",
+    "abbott": "ABT",
+    "abbott laboratories": "ABT",
+    "medtronic": "MDT",
+
+    # Telecom & Media
+    "at&t": "T",
+    "att": "T",
+    "verizon": "VZ",
+    "t-mobile": "TMUS",
+    "tmobile": "TMUS",
+    "comcast": "CMCSA",
+    "charter": "CHTR",
+    "disney": "DIS",
+    "walt disney": "DIS",
+    "warner bros discovery": "WBD",
+    "warner": "WBD",
+    "paramount": "PARA",
+    "fox": "FOX",
+    "netflix": "NFLX",
+
+    # Automotive
+    "ford": "F",
+    "general motors": "GM",
+    "gm": "GM",
+    "toyota": "TM",
+    "honda": "HMC",
+    "bmw": "BMWYY",
+    "mercedes": "MBGAF",
+    "mercedes-benz": "MBGAF",
+    "daimler": "MBGAF",
+    "volkswagen": "VWAGY",
+    "vw": "VWAGY",
+    "ferrari": "RACE",
+    "lucid": "LCID",
+    "lucid motors": "LCID",
+    "rivian": "RIVN",
+    # Indian Companies
+    "reliance industries": "RELIANCE.NS",
+    "reliance": "RELIANCE.NS",
+    "tata motors": "TATAMOTORS.NS",
+    "tata steel": "TATASTEEL.NS",
+    "hdfc bank": "HDB",
+    "hdfc": "HDB",
+    "icici bank": "IBN",
+    "icici": "IBN",
+    "state bank of india": "SBIN.NS",
+    "sbi": "SBIN.NS",
+    "axis bank": "AXISBANK.NS",
+    "bajaj finance": "BAJFINANCE.NS",
+    "bajaj": "BAJFINANCE.NS",
+    "mahindra & mahindra": "M&M.NS",
+    "mahindra": "M&M.NS",
+    "larsen & toubro": "LT.NS",
+    "l&t": "LT.NS",
+    "bharti airtel": "BHARTIARTL.NS",
+    "airtel": "BHARTIARTL.NS",
+    "adani enterprises": "ADANIENT.NS",
+    "adani": "ADANIENT.NS",
+    "sun pharma": "SUNPHARMA.NS",
+    "itc limited": "ITC.NS",
+    "itc": "ITC.NS",
+    "hindustan unilever": "HINDUNILVR.NS",
+    "hul": "HINDUNILVR.NS",
+
+    # Chinese Companies
+    "china mobile": "CHL",
+    "china telecom": "CHA",
+    "china unicom": "CHU",
+    "petrochina": "PTR",
+    "sinopec": "SNP",
+    "china construction bank": "CICHY",
+    "industrial and commercial bank of china": "IDCBY",
+    "icbc": "IDCBY",
+    "bank of china": "BACHY",
+    "agricultural bank of china": "ACGBY",
+    "ping an insurance": "PNGAY",
+    "ping an": "PNGAY",
+    "china life insurance": "LFC",
+    "huawei": "PRIVATE",
+    "xiaomi": "XIACF",
+    "oppo": "PRIVATE",
+    "vivo": "PRIVATE",
+    "byd": "BYDDY",
+    "nio": "NIO",
+    "li auto": "LI",
+    "xpeng": "XPEV",
+    "nikola": "NKLA",
+
+    # Energy
+    "exxon": "XOM",
+    "exxonmobil": "XOM",
+    "chevron": "CVX",
+    "shell": "SHEL",
+    "bp": "BP",
+    "conocophillips": "COP",
+    "occidental": "OXY",
+    "oxy": "OXY",
+    "halliburton": "HAL",
+    "schlumberger": "SLB",
+    "nextera energy": "NEE",
+    "duke energy": "DUK",
+    "southern company": "SO",
+
+    # Industrial
+    "boeing": "BA",
+    "lockheed martin": "LMT",
+    "lockheed": "LMT",
+    "raytheon": "RTX",
+    "rtx": "RTX",
+    "general electric": "GE",
+    "ge": "GE",
+    "3m": "MMM",
+    "caterpillar": "CAT",
+    "honeywell": "HON",
+    "ups": "UPS",
+    "fedex": "FDX",
+    "deere": "DE",
+    "john deere": "DE",
+    "northrop grumman": "NOC",
+    "northrop": "NOC",
+    "siemens": "SIEGY",
+
+    # Travel & Hospitality
+    "marriott": "MAR",
+    "hilton": "HLT",
+    "delta": "DAL",
+    "delta air lines": "DAL",
+    "united airlines": "UAL",
+    "american airlines": "AAL",
+    "southwest": "LUV",
+    "southwest airlines": "LUV",
+    "booking": "BKNG",
+    "booking holdings": "BKNG",
+    "expedia": "EXPE",
+    "carnival": "CCL",
+    "royal caribbean": "RCL"
+}
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "llc", "lp",
+    "ag", "sa", "nv", "holdings", "holding", "group", "com",
+}
+_APOSTROPHES = re.compile(r"['’]")
+_NON_WORD = re.compile(r"[^\w]+")
+
+MIN_PREFIX_LENGTH = 3
+MIN_FUZZY_SCORE = 0.55
+# Leading-word, prefix and fuzzy matches are only hints ("ford foundation" is not F, "metal" is not META,
+# "intuitive" is not INTU), so they score below any sensible acceptance threshold and get confirmed remotely
+PARTIAL_MATCH_CONFIDENCE = 0.6
+
+
+def normalize_name(name: str) -> str:
+    text = _APOSTROPHES.sub("", name.lower().replace("&", " and "))
+    tokens = _NON_WORD.sub(" ", text).split()
+    if tokens and tokens[0] == "the" and len(tokens) > 1:
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+class SymbolIndex:
+    def __init__(self, names=None, learned_path=None):
+        self.learned_path = learned_path
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._keys = []
+        self._grams = {}
+        self._key_grams = {}
+        for name, symbol in (names or {}).items():
+            self._add(name, symbol)
+        if learned_path and os.path.exists(learned_path):
+            try:
+                with open(learned_path, encoding="utf-8") as f:
+                    for name, symbol in json.load(f).items():
+                        self._add(name, symbol)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not load learned symbols from %s: %s", learned_path, e)
+
+    def _add(self, name, symbol):
+        key = normalize_name(name)
+        if not key:
+            return
+        if key not in self._exact:
+            bisect.insort(self._keys, key)
+            grams = _trigrams(key)
+            self._key_grams[key] = grams
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(key)
+        self._exact[key] = symbol
+
+    @staticmethod
+    def _match(key, symbol, confidence, method):
+        return {
+            "symbol": symbol,
+            "name": key,
+            "confidence": round(confidence, 3),
+            "method": method,
+            "private": symbol == PRIVATE,
+        }
+
+    def lookup(self, name):
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._match(key, self._exact[key], 1.0, "exact")
+        return self._leading_tokens(key) or self._prefix(key) or self._fuzzy(key)
+
+    def _leading_tokens(self, key):
+        # "toyota motor" -> "toyota": the longest known name made of the query's leading words
+        tokens = key.split()
+        for count in range(len(tokens) - 1, 0, -1):
+            candidate = " ".join(tokens[:count])
+            if candidate in self._exact:
+                confidence = PARTIAL_MATCH_CONFIDENCE * count / len(tokens)
+                return self._match(candidate, self._exact[candidate], confidence, "tokens")
+        return None
+
+    def _prefix(self, key):
+        if len(key) < MIN_PREFIX_LENGTH:
+            return None
+        start = bisect.bisect_left(self._keys, key)
+        candidates = []
+        for candidate in self._keys[start:]:
+            if not candidate.startswith(key):
+                break
+            candidates.append(candidate)
+        symbols = {self._exact[candidate] for candidate in candidates}
+        if len(symbols) != 1:
+            # Ambiguous prefixes ("micro" -> MSFT, MU) are left to fuzzy matching or the network
+            return None
+        best = min(candidates, key=len)
+        return self._match(best, self._exact[best], PARTIAL_MATCH_CONFIDENCE * len(key) / len(best), "prefix")
+
+    def _fuzzy(self, key):
+        grams = _trigrams(key)
+        overlap = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+        first_grams = _trigrams(key.split()[0])
+        best, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            # Dice coefficient over character trigrams
+            score = 2 * shared / (len(grams) + len(self._key_grams[candidate]))
+            if score <= best_score or _dice(first_grams, _trigrams(candidate.split()[0])) < MIN_FUZZY_SCORE:
+                # Sharing a generic word ("technologies") isn't enough; the leading word must match too
+                continue
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < MIN_FUZZY_SCORE:
+            return None
+        return self._match(best, self._exact[best], PARTIAL_MATCH_CONFIDENCE * best_score, "fuzzy")
+
+    def learn(self, name, symbol):
+        with self._lock:
+            key = normalize_name(name)
+            if not key or self._exact.get(key) == symbol:
+                return
+            self._add(name, symbol)
+            if self.learned_path:
+                self._persist(key, symbol)
+
+    def _persist(self, key, symbol):
+        learned = {}
+        try:
+            with open(self.learned_path, encoding="utf-8") as f:
+                learned = json.load(f)
+        except (OSError, ValueError):
+            pass
+        learned[key] = symbol
+        os.makedirs(os.path.dirname(self.learned_path) or ".", exist_ok=True)
+        partial = f"{self.learned_path}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(learned, f, indent=0, sort_keys=True)
+        os.replace(partial, self.learned_path)
+
+    def __len__(self):
+        return len(self._exact)
@@ -0,0 +1,466 @@
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from summarizer.config import (
+    CACHE_BACKEND, CACHE_COMPRESS_MIN_BYTES, CACHE_DIR, CACHE_REDIS_RETRY_AFTER, CACHE_REDIS_TIMEOUT,
+    CACHE_REDIS_URL, CACHE_SQLITE_BUSY_TIMEOUT
+)
+from summarizer.utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from summarizer.utils.logger import logger
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MISSING = object()
+
+# First byte of every encoded value; upper case means the rest is zlib-compressed
+_MSGPACK = b"m"
+_JSON = b"j"
+# Shared-tier reads refresh the LRU timestamp at most this often, so hot keys don't turn every read into a write
+ACCESS_RESOLUTION = 60
+# One breaker per Redis URL, shared by every cache on that server
+_redis_breakers = {}
+# Seconds between expiry/size sweeps of a SQLite cache; between sweeps max_entries may be overshot a little
+EVICT_INTERVAL = 60
+
+
+def encode(value):
+    # msgpack when installed, JSON otherwise; profiles and search results are mostly text and compress well
+    if msgpack is not None:
+        kind, data = _MSGPACK, msgpack.packb(value, use_bin_type=True)
+    else:
+        kind, data = _JSON, json.dumps(value, separators=(",", ":")).encode("utf-8")
+    if len(data) >= CACHE_COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            kind, data = kind.upper(), compressed
+    return kind + data
+
+
+def decode(blob):
+    if isinstance(blob, str):
+        # Rows written before values were encoded hold plain JSON text
+        return json.loads(blob)
+    kind, data = bytes(blob[:1]), blob[1:]
+    if kind.isupper():
+        kind, data = kind.lower(), zlib.decompress(data)
+    if kind == _MSGPACK:
+        if msgpack is None:
+            raise ValueError("value is msgpack-encoded but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if kind == _JSON:
+        return json.loads(data)
+    raise ValueError(f"unknown cache encoding {kind!r}")
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] < time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return entry
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry if entry is MISSING else entry[1]
+
+    def set(self, key, value, ttl, expires_at=None):
+        with self._lock:
+            self._data[key] = (expires_at or time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._next_evict = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # WAL lets every worker on the host read while one writes; setup may wait for workers starting alongside
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+        # After that, calls come from the event loop: a cache that stalls it costs more than a miss
+        self._conn.execute(f"PRAGMA busy_timeout = {int(CACHE_SQLITE_BUSY_TIMEOUT * 1000)}")
+
+    def get_entry(self, key):
+        # Returns (expires_at, value) so the memory tier can inherit the original expiry
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                logger.warning("Cache read from %s failed: %s", os.path.basename(self.path), e)
+                return MISSING
+            if row is None:
+                return MISSING
+            value, expires_at, accessed_at = row
+            if expires_at < now:
+                self._write("DELETE FROM cache WHERE key = ?", (key,))
+                return MISSING
+            if now - accessed_at > ACCESS_RESOLUTION:
+                self._write("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        try:
+            return expires_at, decode(value)
+        except (ValueError, zlib.error) as e:
+            logger.warning("Dropping undecodable cache entry %s: %s", key, e)
+            self.delete(key)
+            return MISSING
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry if entry is MISSING else entry[1]
+
+    def set(self, key, value, ttl, expires_at=None):
+        now = time.time()
+        blob = encode(value)
+        with self._lock:
+            self._write(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, expires_at or now + ttl, now)
+            )
+            if now >= self._next_evict:
+                self._next_evict = now + EVICT_INTERVAL
+                self._evict(now)
+
+    def delete(self, key):
+        with self._lock:
+            self._write("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _write(self, statement, params):
+        # Caller holds self._lock. A write that can't get the lock within the busy timeout is dropped
+        try:
+            self._conn.execute(statement, params)
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            self._conn.rollback()
+            logger.warning("Skipped write to %s: %s", os.path.basename(self.path), e)
+
+    def _evict(self, now):
+        self._write("DELETE FROM cache WHERE expires_at < ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            self._write(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class RedisCache:
+    # Size is bounded by the server's maxmemory policy (allkeys-lru), not by an entry count
+    def __init__(self, url, namespace):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package (pip install redis)") from None
+        self._errors = (redis.RedisError,)
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=CACHE_REDIS_TIMEOUT, socket_connect_timeout=CACHE_REDIS_TIMEOUT
+        )
+        self._breaker = _redis_breakers.setdefault(url, CircuitBreaker(1, CACHE_REDIS_RETRY_AFTER))
+        self.prefix = f"summarizer:{namespace}:"
+
+    def _call(self, action, func, *args, **kwargs):
+        # An unreachable server degrades to a miss: the memory tier and upstream calls still work
+        try:
+            self._breaker.before_call()
+        except CircuitOpen:
+            return MISSING
+        try:
+            result = func(*args, **kwargs)
+        except self._errors as e:
+            self._breaker.record_failure()
+            logger.warning("Redis cache %s failed, skipping Redis for %.0fs: %s", action, CACHE_REDIS_RETRY_AFTER, e)
+            return MISSING
+        self._breaker.record_success()
+        return result
+
+    def get_entry(self, key):
+        blob = self._call("read", self._client.get, self.prefix + key)
+        if blob is MISSING or blob is None:
+            return MISSING
+        (expires_at,) = struct.unpack("!d", blob[:8])
+        try:
+            return expires_at, decode(blob[8:])
+        except (ValueError, zlib.error) as e:
+            logger.warning("Dropping undecodable cache entry %s: %s", key, e)
+            self.delete(key)
+            return MISSING
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry if entry is MISSING else entry[1]
+
+    def set(self, key, value, ttl, expires_at=None):
+        expires_at = expires_at or time.time() + ttl
+        ttl_ms = int((expires_at - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        blob = struct.pack("!d", expires_at) + encode(value)
+        self._call("write", self._client.set, self.prefix + key, blob, px=ttl_ms)
+
+    def delete(self, key):
+        self._call("delete", self._client.delete, self.prefix + key)
+
+    def __len__(self):
+        count = self._call("count", lambda: sum(1 for _ in self._client.scan_iter(match=f"{self.prefix}*", count=1000)))
+        return 0 if count is MISSING else count
+
+
+class TieredCache:
+    def __init__(self, memory, shared=None):
+        self.memory = memory
+        self.shared = shared
+        self.stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "sets": 0}
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self.stats["memory_hits"] += 1
+            return value
+        if self.shared is not None:
+            entry = self.shared.get_entry(key)
+            if entry is not MISSING:
+                expires_at, value = entry
+                self.memory.set(key, value, None, expires_at=expires_at)
+                self.stats["shared_hits"] += 1
+                return value
+        self.stats["misses"] += 1
+        return MISSING
+
+    def set(self, key, value, ttl):
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, ttl, expires_at=expires_at)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl, expires_at=expires_at)
+        self.stats["sets"] += 1
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def hit_ratio(self):
+        lookups = self.stats["memory_hits"] + self.stats["shared_hits"] + self.stats["misses"]
+        return round((lookups - self.stats["misses"]) / lookups, 4) if lookups else 0.0
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "hit_ratio": self.hit_ratio(),
+            "backend": self.shared.__class__.__name__ if self.shared is not None else "memory",
+            "memory_entries": len(self.memory),
+            "shared_entries": len(self.shared) if self.shared is not None else 0,
+        }
+
+
+def build_cache(name, memory_entries, max_entries):
+    # Every cached layer goes through here, so CACHE_BACKEND switches them all at once
+    if CACHE_BACKEND == "memory":
+        shared = None
+    elif CACHE_BACKEND == "redis":
+        shared = RedisCache(CACHE_REDIS_URL, name)
+    elif CACHE_BACKEND == "sqlite":
+        shared = SQLiteCache(os.path.join(CACHE_DIR, f"{name}.sqlite3"), max_entries)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}: expected sqlite, redis or memory")
+    return TieredCache(LRUCache(memory_entries), shared)
+
+
+# Counters shared the same way as the caches, for budgets every worker draws on (see rate_limiter).
+# take() counts one use against every (key, limit, ttl) window, or none at all if one of them is already at its
+# limit; it returns None on success, otherwise the full key, or BUSY when the backend could not answer in time
+BUSY = "busy"
+
+
+class MemoryCounter:
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _current(self, key, now):
+        used, expires_at = self._counts.get(key, (0, 0.0))
+        return (used, expires_at) if expires_at > now else (0, 0.0)
+
+    def count(self, key):
+        with self._lock:
+            return self._current(key, time.time())[0]
+
+    def take(self, limits):
+        now = time.time()
+        with self._lock:
+            for key, limit, _ in limits:
+                if self._current(key, now)[0] >= limit:
+                    return key
+            for key, _, ttl in limits:
+                used, expires_at = self._current(key, now)
+                self._counts[key] = (used + 1, expires_at or now + ttl)
+            for key in [key for key, (_, expires_at) in self._counts.items() if expires_at <= now]:
+                del self._counts[key]
+        return None
+
+    def raise_to(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            used, expires_at = self._current(key, now)
+            self._counts[key] = (max(used, value), expires_at or now + ttl)
+
+
+class SQLiteCounter:
+    def __init__(self, path, namespace):
+        self.path = path
+        self.prefix = f"{namespace}:"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit: take() runs its own BEGIN IMMEDIATE so the check and the increment are one transaction
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            "key TEXT PRIMARY KEY, used INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"PRAGMA busy_timeout = {int(CACHE_SQLITE_BUSY_TIMEOUT * 1000)}")
+
+    def count(self, key):
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT used FROM counters WHERE key = ? AND expires_at > ?", (self.prefix + key, time.time())
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                logger.warning("Counter read from %s failed: %s", os.path.basename(self.path), e)
+                return 0
+        return row[0] if row else 0
+
+    def _update(self, func):
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                result = func(time.time())
+                self._conn.execute("COMMIT")
+                return result
+            except sqlite3.OperationalError as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.warning("Counter update in %s skipped: %s", os.path.basename(self.path), e)
+                return BUSY
+
+    def take(self, limits):
+        def take(now):
+            for key, limit, _ in limits:
+                row = self._conn.execute(
+                    "SELECT used FROM counters WHERE key = ? AND expires_at > ?", (self.prefix + key, now)
+                ).fetchone()
+                if row and row[0] >= limit:
+                    return key
+            for key, _, ttl in limits:
+                self._conn.execute(
+                    "INSERT INTO counters (key, used, expires_at) VALUES (?, 1, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "used = CASE WHEN expires_at > ? THEN used + 1 ELSE 1 END, "
+                    "expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END",
+                    (self.prefix + key, now + ttl, now, now)
+                )
+            self._conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+            return None
+
+        return self._update(take)
+
+    def raise_to(self, key, value, ttl):
+        def raise_to(now):
+            self._conn.execute(
+                "INSERT INTO counters (key, used, expires_at) VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "used = CASE WHEN expires_at > ? THEN MAX(used, excluded.used) ELSE excluded.used END, "
+                "expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END",
+                (self.prefix + key, value, now + ttl, now, now)
+            )
+
+        self._update(raise_to)
+
+
+class RedisCounter:
+    # While Redis is unreachable counting falls back to this process only, so requests keep flowing
+    def __init__(self, url, namespace):
+        self._redis = RedisCache(url, f"counter:{namespace}")
+        self._local = MemoryCounter()
+
+    def count(self, key):
+        used = self._redis._call("read", self._redis._client.get, self._redis.prefix + key)
+        if used is MISSING:
+            return self._local.count(key)
+        return int(used or 0)
+
+    def take(self, limits):
+        keys = [self._redis.prefix + key for key, _, _ in limits]
+
+        def take():
+            pipe = self._redis._client.pipeline()
+            for name, (_, _, ttl) in zip(keys, limits):
+                # Creates the window with its expiry on first use; INCR keeps the TTL
+                pipe.set(name, 0, ex=ttl, nx=True)
+                pipe.incr(name)
+            counts = pipe.execute()[1::2]
+            for (key, limit, _), used in zip(limits, counts):
+                if used > limit:
+                    undo = self._redis._client.pipeline()
+                    for other in keys:
+                        undo.decr(other)
+                    undo.execute()
+                    return key
+            return None
+
+        full = self._redis._call("update", take)
+        return self._local.take(limits) if full is MISSING else full
+
+    def raise_to(self, key, value, ttl):
+        self._local.raise_to(key, value, ttl)
+        self._redis._call("update", self._redis._client.set, self._redis.prefix + key, value, ex=ttl)
+
+
+def build_counter(name):
+    if CACHE_BACKEND == "memory":
+        return MemoryCounter()
+    if CACHE_BACKEND == "redis":
+        return RedisCounter(CACHE_REDIS_URL, name)
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCounter(os.path.join(CACHE_DIR, "counters.sqlite3"), name)
+    raise ValueError(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}: expected sqlite, redis or memory")
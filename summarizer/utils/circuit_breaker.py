@@ -0,0 +1,59 @@
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {"opened": 0, "short_circuited": 0}
+
+    def before_call(self):
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.stats["short_circuited"] += 1
+                raise CircuitOpen(f"Circuit open, retrying upstream in {self.retry_in():.1f}s")
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            # A single probe decides whether to close again; everyone else keeps failing fast
+            if self._probing:
+                self.stats["short_circuited"] += 1
+                raise CircuitOpen("Circuit half-open, probe in flight")
+            self._probing = True
+
+    def record_success(self):
+        self.state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats["opened"] += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        # The call ended without telling us anything about upstream health (e.g. cancelled)
+        self._probing = False
+
+    def retry_in(self):
+        if self.state != OPEN:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def snapshot(self):
+        return {**self.stats, "state": self.state, "failures": self._failures, "retry_in": round(self.retry_in(), 1)}
@@ -0,0 +1,10 @@
+import re
+
+
+def sanitize_entity(entity: str) -> str:
+    return re.sub(r'[^\w\s-]', '', entity).strip()
+
+
+def normalize_entity(entity: str) -> str:
+    # Cache/lookup key: case- and whitespace-insensitive form of the sanitized name
+    return " ".join(sanitize_entity(entity).lower().split())
@@ -1,7 +1,20 @@
+import contextvars
 import logging
 
+# Set per request by the middleware in main.py; background work copies it from the request that queued it
+correlation_id = contextvars.ContextVar("correlation_id", default="-")
+
+
+class CorrelationIdFilter(logging.Filter):
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s'
 )
-logger = logging.getLogger(__name__)
\ No newline at end of file
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(CorrelationIdFilter())
+logger = logging.getLogger(__name__)
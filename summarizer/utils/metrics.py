@@ -0,0 +1,131 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers cache hits (ms) up to slow Gemini calls and batch renders
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + list(extra or ())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        # Records even when the block raises; put the outcome in a label by setting labels["outcome"]
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        samples = []
+        with _lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (("le", _format_value(float(bound))),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+def _render_family(name, kind, help_text, samples):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}" for sample, labels, value in samples)
+    return lines
+
+
+def render(gauges=()):
+    # gauges: (name, help, [(labels dict, value), ...]) read from the services at scrape time
+    lines = []
+    for metric in list(_registry):
+        lines.extend(_render_family(metric.name, metric.kind, metric.help, metric.samples()))
+    for name, help_text, values in gauges:
+        samples = [(name, tuple(sorted(labels.items())), value) for labels, value in values if value is not None]
+        lines.extend(_render_family(name, "gauge", help_text, samples))
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_LATENCY = Histogram(
+    "summarizer_http_request_duration_seconds", "API request latency", ("method", "route", "status")
+)
+STAGE_LATENCY = Histogram(
+    "summarizer_stage_duration_seconds", "Latency of each /summarize source and report render stage",
+    ("stage", "outcome")
+)
+UPSTREAM_LATENCY = Histogram(
+    "summarizer_upstream_request_duration_seconds", "Latency of calls to upstream providers", ("provider", "outcome")
+)
+UPSTREAM_ERRORS = Counter(
+    "summarizer_upstream_errors_total", "Failed upstream calls by provider and kind", ("provider", "kind")
+)
+UPSTREAM_THROTTLES = Counter(
+    "summarizer_upstream_throttles_total", "Upstream quota/throttle responses and local quota rejections",
+    ("provider", "source")
+)
@@ -0,0 +1,28 @@
+import time
+from contextlib import contextmanager
+
+from summarizer.utils.logger import logger
+
+# phase -> seconds, in the order the phases finished; served by /cache/stats and /metrics
+phases = {}
+
+
+def record(name, seconds):
+    phases[name] = seconds
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def report():
+    return {name: round(seconds * 1000, 1) for name, seconds in phases.items()}
+
+
+def log(title):
+    logger.info("%s: %s", title, ", ".join(f"{name} {ms:.0f}ms" for name, ms in report().items()) or "nothing recorded")
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Before any summarizer import: keep caches in memory and anything on disk out of the working tree
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="summarizer-tests-"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from summarizer.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+def _fail(breaker, times):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def _open_then_wait(reset_timeout=0.02):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    _fail(breaker, 1)
+    time.sleep(reset_timeout * 1.5)
+    return breaker
+
+
+def test_opens_after_threshold_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.stats["opened"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    _fail(breaker, 1)
+    breaker.record_success()
+    _fail(breaker, 1)
+    assert breaker.state == CLOSED
+
+
+def test_open_circuit_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    _fail(breaker, 1)
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    assert breaker.stats["short_circuited"] == 1
+    assert 29 < breaker.retry_in() <= 30
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = _open_then_wait()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen, match="probe in flight"):
+        breaker.before_call()
+
+
+def test_successful_probe_closes():
+    breaker = _open_then_wait()
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = _open_then_wait()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_released_probe_lets_the_next_caller_probe():
+    breaker = _open_then_wait()
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
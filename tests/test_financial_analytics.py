@@ -0,0 +1,83 @@
+import pytest
+
+from summarizer.services.financial_analytics import compute
+
+
+def _report(fiscal_date, revenue=None, profit=None, **fields):
+    report = {"fiscal_date_ending": fiscal_date, "reported_currency": "USD", **fields}
+    if revenue is not None:
+        report["totalRevenue"] = revenue
+    if profit is not None:
+        report["netIncome"] = profit
+    return report
+
+
+QUARTER_ENDS = ["03-31", "06-30", "09-30", "12-31"]
+
+
+def _quarters(year, revenues, profits=None):
+    profits = profits or [None] * len(revenues)
+    return [
+        _report(f"{year + i // 4}-{QUARTER_ENDS[i % 4]}", revenue, profit)
+        for i, (revenue, profit) in enumerate(zip(revenues, profits))
+    ]
+
+
+def test_no_reports():
+    assert compute([]) is None
+    assert compute([{"totalRevenue": 1.0}]) is None
+
+
+def test_quarters_are_laid_on_a_continuous_axis():
+    reports = [_report("2023-03-31", 100.0), _report("2023-09-30", 120.0)]
+    result = compute(reports)
+    assert result["periods"] == ["2023-Q1", "2023-Q2", "2023-Q3"]
+    # The missing quarter and the unreported profit stay null rather than becoming zero
+    assert result["series"]["revenue"] == [100.0, None, 120.0]
+    assert result["series"]["profit"] == [None, None, None]
+    assert result["currency"] == "USD"
+
+
+def test_changes_and_trailing_totals():
+    result = compute(_quarters(2022, [100.0, 110.0, 121.0, 100.0, 200.0]))
+    assert result["qoq_pct"]["revenue"] == [None, 10.0, 10.0, -17.36, 100.0]
+    assert result["yoy_pct"]["revenue"] == [None, None, None, None, 100.0]
+    assert result["ttm"]["revenue"] == [None, None, None, 431.0, 531.0]
+
+
+def test_trailing_total_needs_four_reported_quarters():
+    reports = _quarters(2022, [100.0, 100.0, 100.0, 100.0, 100.0])
+    del reports[2]["totalRevenue"]
+    assert compute(reports)["ttm"]["revenue"] == [None, None, None, None, None]
+
+
+def test_change_from_zero_is_null():
+    assert compute(_quarters(2022, [0.0, 50.0]))["qoq_pct"]["revenue"] == [None, None]
+
+
+def test_margins_skip_quarters_without_revenue():
+    reports = _quarters(2023, [200.0, 0.0], [50.0, 10.0])
+    assert compute(reports)["margins_pct"]["net_margin"] == [25.0, None]
+
+
+def test_forecast_needs_three_quarters():
+    assert compute(_quarters(2023, [100.0, 110.0]))["forecast"] is None
+
+
+def test_linear_forecast_follows_the_trend():
+    result = compute(_quarters(2023, [100.0, 110.0, 120.0, 130.0], [10.0, 11.0, 12.0, 13.0]), horizon=2)
+    forecast = result["forecast"]
+    assert forecast["periods"] == ["2024-Q1", "2024-Q2"]
+    assert forecast["revenue"]["method"] == "linear"
+    assert forecast["revenue"]["mean"] == [140.0, 150.0]
+    # A perfect fit leaves no residual spread
+    assert forecast["revenue"]["lower"] == forecast["revenue"]["upper"] == [140.0, 150.0]
+    assert forecast["profit"]["mean"] == [14.0, 15.0]
+
+
+def test_seasonal_forecast_with_two_years_of_history():
+    revenues = [100.0, 80.0, 90.0, 150.0] * 2 + [100.0, 80.0]
+    forecast = compute(_quarters(2021, revenues), horizon=2)["forecast"]["revenue"]
+    assert forecast["method"] == "linear+seasonal"
+    assert forecast["mean"] == pytest.approx([90.0, 150.0], abs=0.01)
+    assert all(low <= mean <= high for low, mean, high in zip(forecast["lower"], forecast["mean"], forecast["upper"]))
@@ -0,0 +1,22 @@
+from summarizer.services.financial_store import FinancialStore
+
+
+def _report(fiscal_date, **fields):
+    return {"fiscalDateEnding": fiscal_date, "reportedCurrency": "USD", **fields}
+
+
+def test_missing_figures_stay_missing(tmp_path):
+    store = FinancialStore(str(tmp_path / "financials.sqlite3"))
+    store.upsert_reports("ACME", [_report("2024-03-31", totalRevenue="1000", netIncome="None")])
+    (report,) = store.get_reports("ACME")
+    assert report["totalRevenue"] == 1000.0
+    assert "netIncome" not in report
+
+
+def test_column_added_by_another_worker(tmp_path):
+    path = str(tmp_path / "financials.sqlite3")
+    first, second = FinancialStore(path), FinancialStore(path)
+    first.upsert_reports("ACME", [_report("2024-03-31", newField="5")])
+    # second still has the column list it read at startup
+    second.upsert_reports("ACME", [_report("2024-06-30", newField="7")])
+    assert [report["newField"] for report in first.get_reports("ACME")] == [5.0, 7.0]
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from summarizer.services import gemini_service
+from summarizer.utils.cache import LRUCache, TieredCache
+from summarizer.utils.circuit_breaker import CircuitBreaker
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, chunks=("Alpha ", "beta ", "gamma"), delay=0.01):
+        self.chunks = chunks
+        self.delay = delay
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False, generation_config=None):
+        self.calls += 1
+        if not stream:
+            await asyncio.sleep(self.delay * len(self.chunks))
+            return FakeResponse("".join(self.chunks))
+
+        async def chunks():
+            for text in self.chunks:
+                await asyncio.sleep(self.delay)
+                yield FakeChunk(text)
+
+        return chunks()
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = FakeModel()
+    client = gemini_service.GeminiClient(lambda: model, 4, 5.0, 0, CircuitBreaker())
+    monkeypatch.setattr(gemini_service, "client", client)
+    monkeypatch.setattr(gemini_service, "GEMINI_STRUCTURED_OUTPUT", False)
+    monkeypatch.setattr(gemini_service, "profile_cache", TieredCache(LRUCache(16)))
+    return model
+
+
+async def _read(entity):
+    return "".join([text async for text in gemini_service.stream_company_profile(entity)])
+
+
+def test_concurrent_streams_share_one_call(model):
+    async def run():
+        return await asyncio.gather(*(_read("Nvidia") for _ in range(6)))
+
+    results = asyncio.run(run())
+    assert model.calls == 1
+    assert results == ["Alpha beta gamma"] * 6
+    assert gemini_service.profile_entry("Nvidia")["text"] == "Alpha beta gamma"
+
+
+def test_late_reader_replays_earlier_chunks(model):
+    async def run():
+        first = asyncio.create_task(_read("Intel"))
+        await asyncio.sleep(0.015)
+        return await asyncio.gather(first, _read("Intel"))
+
+    assert asyncio.run(run()) == ["Alpha beta gamma"] * 2
+    assert model.calls == 1
+
+
+def test_get_profile_joins_running_stream(model):
+    async def run():
+        stream = asyncio.create_task(_read("Arm"))
+        await asyncio.sleep(0)
+        return await asyncio.gather(stream, gemini_service.get_profile("Arm"))
+
+    streamed, profile = asyncio.run(run())
+    assert model.calls == 1
+    assert profile["text"] == streamed
+
+
+def test_concurrent_get_profile_share_one_call(model):
+    async def run():
+        return await asyncio.gather(*(gemini_service.get_profile("Qualcomm") for _ in range(4)))
+
+    assert len({profile["text"] for profile in asyncio.run(run())}) == 1
+    assert model.calls == 1
+
+
+def test_stream_error_reaches_every_reader(model):
+    async def failing(prompt, stream=False, generation_config=None):
+        model.calls += 1
+        raise ValueError("blocked prompt")
+
+    model.generate_content_async = failing
+
+    async def run():
+        return await asyncio.gather(*(_read("Acme") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert model.calls == 1
+    assert all(isinstance(result, gemini_service.GeminiError) for result in results)
@@ -0,0 +1,35 @@
+import pytest
+
+from summarizer.services.google_search import _entity_labels, _is_official, _rank_documents
+
+
+@pytest.mark.parametrize("entity, domain", [
+    ("Ford", "www.ford.com"),
+    ("Ford Motor Company", "corporate.ford.com"),
+    ("Meta Platforms", "about.meta.com"),
+    ("Coca-Cola", "www.coca-cola.com"),
+    ("Bank of America", "investor.bankofamerica.com"),
+])
+def test_company_domains_are_official(entity, domain):
+    assert _is_official(domain, _entity_labels(entity))
+
+
+@pytest.mark.parametrize("entity, domain", [
+    ("Ford", "www.stanford.edu"),
+    ("Meta", "www.metacritic.com"),
+    ("Apple", "www.pineapplefund.org"),
+    ("Apple Inc", "www.sec.gov"),
+])
+def test_substrings_are_not_official(entity, domain):
+    assert not _is_official(domain, _entity_labels(entity))
+
+
+def test_official_documents_rank_first_within_a_year():
+    pages = [[
+        {"title": "Stanford study 2023", "link": "https://www.stanford.edu/2023/ford.pdf"},
+        {"title": "10-K 2023", "link": "https://www.sec.gov/2023/ford-10k.pdf"},
+        {"title": "Annual Report 2023", "link": "https://corporate.ford.com/2023/annual-report.pdf"},
+    ]]
+    ranked = _rank_documents("Ford", pages)
+    assert [doc["domain"] for doc in ranked] == ["corporate.ford.com", "sec.gov", "stanford.edu"]
+    assert [doc["official"] for doc in ranked] == [True, False, False]
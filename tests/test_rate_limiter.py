@@ -0,0 +1,142 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from summarizer.services import rate_limiter
+from summarizer.services.rate_limiter import BATCH, INTERACTIVE, QuotaExhausted, QuotaScheduler
+from summarizer.utils.cache import SQLiteCounter
+
+MINUTE_START = 60 * 29_000_000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Wall clock used for the minute window; asyncio keeps running on the real monotonic clock
+    now = [MINUTE_START + 10.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def test_requests_within_quota_are_granted(clock):
+    quota = QuotaScheduler(per_minute=3, per_day=10)
+
+    async def run():
+        for _ in range(3):
+            await quota.acquire()
+
+    asyncio.run(run())
+    assert quota.snapshot()["used_this_minute"] == 3
+    assert quota.remaining_today() == 7
+
+
+def test_full_minute_queues_until_the_next_window(clock):
+    quota = QuotaScheduler(per_minute=1, per_day=10)
+
+    async def run():
+        await quota.acquire()
+        waiting = asyncio.create_task(quota.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert quota.snapshot()["waiting"] == 1
+        waiting.cancel()
+
+    asyncio.run(run())
+    assert quota.stats["queued"] == 1
+
+
+def test_interactive_callers_are_served_before_batch(clock):
+    clock[0] = MINUTE_START + 59.95
+    quota = QuotaScheduler(per_minute=1, per_day=10)
+
+    async def run():
+        await quota.acquire()
+        batch = asyncio.create_task(quota.acquire(priority=BATCH))
+        interactive = asyncio.create_task(quota.acquire(priority=INTERACTIVE))
+        await asyncio.sleep(0.01)
+        # Both are queued behind the full minute; the next one opens a single slot
+        clock[0] = MINUTE_START + 60.5
+        await asyncio.wait_for(interactive, 1)
+        assert not batch.done()
+        batch.cancel()
+
+    asyncio.run(run())
+
+
+def test_daily_quota_rejects_without_queueing(clock):
+    quota = QuotaScheduler(per_minute=10, per_day=2)
+
+    async def run():
+        await quota.acquire()
+        await quota.acquire()
+        with pytest.raises(QuotaExhausted, match="Daily quota"):
+            await quota.acquire()
+
+    asyncio.run(run())
+    assert quota.stats["rejected"] == 1
+    assert quota.stats["queued"] == 0
+
+
+def test_upstream_throttle_fails_fast_during_cooldown(clock):
+    quota = QuotaScheduler(per_minute=10, per_day=10, throttle_cooldown=60)
+    quota.record_throttle()
+    with pytest.raises(QuotaExhausted, match="cooling down"):
+        asyncio.run(quota.acquire())
+
+
+def test_exhaust_day_uses_up_the_remaining_budget(clock):
+    quota = QuotaScheduler(per_minute=10, per_day=10, throttle_cooldown=0)
+    quota.exhaust_day()
+    assert quota.remaining_today() == 0
+    with pytest.raises(QuotaExhausted, match="Daily quota"):
+        asyncio.run(quota.acquire())
+
+
+def test_day_follows_the_reset_timezone(monkeypatch):
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            # 03:00 UTC on Jan 2 is still the evening of Jan 1 in California
+            return datetime(2026, 1, 2, 3, 0, tzinfo=timezone.utc).astimezone(tz)
+
+    monkeypatch.setattr(rate_limiter, "datetime", FixedDatetime)
+    assert QuotaScheduler(5, 25)._day_key() == "day:2026-01-02"
+    assert QuotaScheduler(5, 25, reset_timezone="America/Los_Angeles")._day_key() == "day:2026-01-01"
+
+
+def test_schedulers_on_one_counter_share_the_budget(tmp_path, clock):
+    path = str(tmp_path / "counters.sqlite3")
+    first = QuotaScheduler(10, 3, counter=SQLiteCounter(path, "provider"))
+    second = QuotaScheduler(10, 3, counter=SQLiteCounter(path, "provider"))
+
+    async def run():
+        await first.acquire()
+        await second.acquire()
+        await first.acquire()
+        with pytest.raises(QuotaExhausted):
+            await second.acquire()
+
+    asyncio.run(run())
+    # A restarted worker picks up today's usage instead of a fresh budget
+    assert QuotaScheduler(10, 3, counter=SQLiteCounter(path, "provider")).remaining_today() == 0
+    assert QuotaScheduler(10, 3, counter=SQLiteCounter(path, "other")).remaining_today() == 3
+
+
+def test_in_flight_caps_concurrent_requests():
+    quota = QuotaScheduler(100, 100, max_concurrency=2)
+    active = []
+    peak = []
+
+    async def request():
+        async with quota.in_flight():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max(peak) == 2
@@ -0,0 +1,43 @@
+import os
+import time
+
+from summarizer.services.report_cache import ReportCache
+
+
+def _write(path, size=10, age=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_gc_evicts_oldest_past_max_age(tmp_path):
+    cache = ReportCache(str(tmp_path / "reports"), max_bytes=10_000, max_age=3600)
+    old = _write(cache.path_for("a" * 64), age=7200)
+    fresh = _write(cache.path_for("b" * 64))
+    assert cache.gc() == 1
+    assert not os.path.exists(old) and os.path.exists(fresh)
+
+
+def test_gc_keeps_under_max_bytes(tmp_path):
+    cache = ReportCache(str(tmp_path / "reports"), max_bytes=25, max_age=3600)
+    paths = [_write(cache.path_for(c * 64), age=100 - i) for i, c in enumerate("abc")]
+    assert cache.gc() == 1
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+
+
+def test_gc_sweeps_legacy_reports(tmp_path):
+    legacy = tmp_path / "summaries"
+    cache = ReportCache(str(legacy / "reports"), max_bytes=10_000, max_age=3600, legacy_dir=str(legacy))
+    expired = _write(str(legacy / "Acme_summary_20240101_final.pdf"), age=7200)
+    recent = _write(str(legacy / "Acme_summary_20240102_final.pdf"))
+    unrelated = _write(str(legacy / "notes.pdf"), age=7200)
+    _write(str(legacy / "temp" / "temp_Acme_summary_20240101.html"))
+
+    cache.gc()
+    assert not os.path.exists(expired)
+    assert os.path.exists(recent) and os.path.exists(unrelated)
+    assert not os.path.exists(legacy / "temp")
+    assert cache.snapshot()["bytes"] == 10
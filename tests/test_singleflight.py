@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from summarizer.utils.singleflight import SingleFlight
+
+
+class Upstream:
+    def __init__(self, result="value", error=None, delay=0.02):
+        self.result = result
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", upstream) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert upstream.calls == 1
+    assert flight.stats == {"leaders": 1, "followers": 4}
+    assert len(flight) == 0
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    async def run():
+        await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream))
+
+    asyncio.run(run())
+    assert upstream.calls == 2
+
+
+def test_finished_key_runs_again():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    async def run():
+        await flight.do("key", upstream)
+        assert "key" not in flight
+        await flight.do("key", upstream)
+
+    asyncio.run(run())
+    assert upstream.calls == 2
+
+
+def test_error_reaches_every_caller():
+    flight = SingleFlight()
+    upstream = Upstream(error=ValueError("upstream down"))
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert upstream.calls == 1
+    assert "key" not in flight
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+    upstream = Upstream(delay=0.05)
+
+    async def run():
+        leaving = asyncio.create_task(flight.do("key", upstream))
+        staying = asyncio.create_task(flight.do("key", upstream))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(run()) == "value"
+    assert upstream.calls == 1
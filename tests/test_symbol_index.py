@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from summarizer.services.symbol_index import KNOWN_SYMBOLS, PRIVATE, SymbolIndex, normalize_name
+
+# alpha_financials.MIN_SYMBOL_CONFIDENCE; importing that module would open the statement store
+MIN_SYMBOL_CONFIDENCE = 0.7
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SymbolIndex(KNOWN_SYMBOLS)
+
+
+def test_normalize_name_drops_articles_and_legal_suffixes():
+    assert normalize_name("The Coca-Cola Company") == "coca cola"
+    assert normalize_name("AT&T Inc.") == "at and t"
+    assert normalize_name("McDonald's Corp") == "mcdonalds"
+    assert normalize_name("Holdings") == "holdings"
+
+
+@pytest.mark.parametrize("name, symbol", [
+    ("Microsoft", "MSFT"),
+    ("Apple Inc.", "AAPL"),
+    ("the Apple company", "AAPL"),
+])
+def test_exact_names_resolve_locally(index, name, symbol):
+    match = index.lookup(name)
+    assert match["symbol"] == symbol
+    assert match["method"] == "exact"
+    assert match["confidence"] >= MIN_SYMBOL_CONFIDENCE
+
+
+@pytest.mark.parametrize("name", [
+    "Meta Materials", "Ford Foundation", "Toyota Motor Corporation",  # leading tokens
+    "Intuitive", "Metal", "micro", "Zoomi", "General Mills",  # fuzzy
+])
+def test_partial_matches_stay_below_the_threshold(index, name):
+    match = index.lookup(name)
+    assert match is None or match["confidence"] < MIN_SYMBOL_CONFIDENCE
+
+
+def test_leading_tokens_prefer_the_longest_known_name():
+    index = SymbolIndex({"bank": "BK", "bank of america": "BAC"})
+    match = index.lookup("Bank of America Merrill Lynch")
+    assert (match["symbol"], match["method"]) == ("BAC", "tokens")
+
+
+def test_prefix_must_be_unambiguous():
+    index = SymbolIndex({"microsoft": "MSFT", "micron": "MU"})
+    assert index.lookup("micr")["method"] != "prefix"
+    match = index.lookup("micros")
+    assert (match["symbol"], match["method"]) == ("MSFT", "prefix")
+    assert match["confidence"] < MIN_SYMBOL_CONFIDENCE
+
+
+def test_fuzzy_requires_a_matching_leading_word():
+    index = SymbolIndex({"advanced micro devices": "AMD"})
+    assert index.lookup("Applied Micro Devices") is None
+
+
+def test_private_companies_are_flagged():
+    match = SymbolIndex({"bosch": PRIVATE}).lookup("Bosch")
+    assert match["private"] is True
+
+
+def test_learned_names_persist(tmp_path):
+    path = tmp_path / "learned.json"
+    SymbolIndex({}, learned_path=str(path)).learn("Intuitive Surgical, Inc.", "ISRG")
+    assert json.loads(path.read_text()) == {"intuitive surgical": "ISRG"}
+    assert SymbolIndex({}, learned_path=str(path)).lookup("Intuitive Surgical")["symbol"] == "ISRG"